@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import sys
+import time
+from difflib import SequenceMatcher
+
+# 로컬 정렬 신뢰도가 이보다 낮은 구간만 LLM 병합으로 넘김
+ALIGN_MIN_CONFIDENCE = float(os.getenv("ALIGN_MIN_CONFIDENCE", "0.5"))
+
+_IGNORED = re.compile(r"[\s.,!?~…·\"'“”‘’()\[\]-]")
+
+
+def _syllables(text):
+    """공백/문장부호를 뺀 음절(문자) 시퀀스와 원문 위치"""
+    chars, positions = [], []
+    for i, ch in enumerate(text):
+        if not _IGNORED.match(ch):
+            chars.append(ch.lower())
+            positions.append(i)
+    return chars, positions
+
+
+def align(whisper_text, azure_entries, min_confidence=ALIGN_MIN_CONFIDENCE):
+    """
+    Whisper 텍스트를 Azure 발화(화자 턴)에 음절 단위로 정렬해서 화자별 발화로 나눕니다.
+
+    반환: [{"speaker", "text", "source", "confidence", "azure": [Azure 발화 index...]}, ...]
+    - confidence: 구간의 Whisper 음절 중 Azure와 일치한 비율
+    - confidence < min_confidence인 구간은 "low_confidence": True
+    """
+    whisper_text = (whisper_text or "").strip()
+    if not azure_entries:
+        if not whisper_text:
+            return []
+        return [{"speaker": "Unknown", "text": whisper_text, "source": "Whisper",
+                 "confidence": 0.0, "azure": [], "low_confidence": True}]
+    if not whisper_text:
+        # Whisper 결과가 없으면 Azure 발화를 그대로 사용
+        return [{"speaker": e["speaker"], "text": e["text"], "source": "Azure",
+                 "confidence": 1.0, "azure": [i], "low_confidence": False}
+                for i, e in enumerate(azure_entries)]
+
+    # Azure 음절마다 어느 발화에 속하는지 표시
+    azure_chars, owner = [], []
+    for index, entry in enumerate(azure_entries):
+        chars, _ = _syllables(entry.get("text", ""))
+        azure_chars.extend(chars)
+        owner.extend([index] * len(chars))
+    whisper_chars, _ = _syllables(whisper_text)
+
+    # Whisper 음절 -> Azure 발화 index
+    # 일치 구간은 그대로, 치환 구간은 대응하는 Azure 구간에 비례 배치, 삽입 구간은 바로 뒤 Azure 음절을 따름
+    owner_of = [0] * len(whisper_chars)
+    matched = [False] * len(whisper_chars)
+    matcher = SequenceMatcher(None, whisper_chars, azure_chars, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for k in range(i1, i2):
+            if tag == "equal":
+                owner_of[k] = owner[j1 + k - i1]
+                matched[k] = True
+            elif tag == "replace":
+                owner_of[k] = owner[j1 + (k - i1) * (j2 - j1) // (i2 - i1)]
+            else:
+                owner_of[k] = owner[min(j1, len(owner) - 1)] if owner else 0
+
+    # 단어(공백 단위)마다 음절 다수결로 화자 턴 결정
+    words = []
+    char_index = 0
+    for word in whisper_text.split():
+        n = len(_syllables(word)[0])
+        owners = owner_of[char_index:char_index + n] or owner_of[max(0, char_index - 1):char_index] or [0]
+        words.append((word, max(set(owners), key=owners.count), sum(matched[char_index:char_index + n]), n))
+        char_index += n
+
+    # 같은 Azure 발화에 속한 연속 단어를 하나의 발화로 묶고, 같은 화자의 연속 발화는 합침
+    result = []
+    for word, index, hits, n in words:
+        speaker = azure_entries[index]["speaker"]
+        if result and result[-1]["speaker"] == speaker:
+            span = result[-1]
+            span["text"] += " " + word
+            if index not in span["azure"]:
+                span["azure"].append(index)
+        else:
+            span = {"speaker": speaker, "text": word, "source": "Whisper", "azure": [index],
+                    "_hits": 0, "_chars": 0}
+            result.append(span)
+        span["_hits"] += hits
+        span["_chars"] += n
+    for span in result:
+        hits, chars = span.pop("_hits"), span.pop("_chars")
+        span["confidence"] = hits / chars if chars else 0.0
+        span["low_confidence"] = span["confidence"] < min_confidence
+    return result
+
+
+def uncovered_spans(spans, covered_text):
+    """
+    spans를 LLM으로 병합하다 응답이 중간에 끊겼을 때, 이미 받은 발화(covered_text)가 덮지 못한 뒷부분을 반환합니다.
+    covered_text와 3음절 이상 일치한 마지막 위치를 찾고(받은 음절 수보다 많이 앞서지는 않게), 그 뒤 단어만 남깁니다.
+    경계에 걸친 단어는 남깁니다 (발화가 빠지는 것보다 조금 겹치는 편이 낫기 때문).
+    """
+    run_chars = [ch for span in spans for ch in _syllables(span["text"])[0]]
+    covered_chars, _ = _syllables(covered_text)
+    end = 0
+    if covered_chars:
+        matcher = SequenceMatcher(None, run_chars, covered_chars, autojunk=False)
+        for a, _, size in matcher.get_matching_blocks():
+            if size >= 3:
+                end = a + size
+        end = min(end, len(covered_chars) + len(covered_chars) // 5)
+    result = []
+    pos = 0
+    for span in spans:
+        words = []
+        for word in span["text"].split():
+            n = len(_syllables(word)[0])
+            if pos + n > end:
+                words.append(word)
+            pos += n
+        if words:
+            result.append(dict(span, text=" ".join(words)))
+    return result
+
+
+def to_log_entries(spans):
+    """정렬 결과를 회의록 항목 형식({"speaker","text","source"})으로 변환"""
+    return [{"speaker": s["speaker"], "text": s["text"], "source": s["source"]} for s in spans]
+
+
+def _synthetic_fixtures(n=20):
+    """고정 샘플이 없을 때 쓰는 예시: Azure 발화 일부를 Whisper 쪽에서 바꿔 인식 차이를 흉내"""
+    turns = [
+        ("화자 A", "안녕하세요 저는 김아영입니다 오늘 회의를 시작하겠습니다"),
+        ("화자 B", "네 이주혜입니다 지난주 진행사항부터 공유드릴게요"),
+        ("화자 A", "좋습니다 배포 일정은 다음 주 수요일로 확정하는 걸로 하죠"),
+        ("화자 B", "QA 일정이 빠듯해서 하루 정도 여유가 필요할 것 같습니다"),
+    ]
+    fixtures = []
+    for i in range(n):
+        azure = [{"speaker": s, "text": t, "source": "Azure"} for s, t in turns]
+        whisper = " ".join(t for _, t in turns).replace("김아영", "김아용").replace("QA", "큐에이")
+        fixtures.append({"whisper": whisper, "azure": azure})
+    return fixtures
+
+
+def _bench(path=None, use_llm=False):
+    """로컬 정렬과 LLM 병합의 세그먼트당 처리 시간 비교 (fixture: [{"whisper": str, "azure": [...]}])"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = _synthetic_fixtures()
+
+    t0 = time.perf_counter()
+    low = 0
+    for fx in fixtures:
+        spans = align(fx["whisper"], fx["azure"])
+        low += sum(s["low_confidence"] for s in spans)
+    local = (time.perf_counter() - t0) / len(fixtures)
+    print(f"로컬 정렬: 세그먼트당 {local * 1000:.2f}ms, 저신뢰 구간 {low}개 / {len(fixtures)}개 세그먼트")
+    print(f"  예시: {to_log_entries(align(fixtures[0]['whisper'], fixtures[0]['azure']))}")
+
+    if use_llm:
+        from noteagent import llm_merge
+        t0 = time.perf_counter()
+        for fx in fixtures:
+            llm_merge(fx["whisper"], fx["azure"])
+        remote = (time.perf_counter() - t0) / len(fixtures)
+        print(f"LLM 병합: 세그먼트당 {remote * 1000:.0f}ms ({remote / local:.0f}x)")
+
+
+if __name__ == "__main__":
+    # 사용법: python aligner.py [fixtures.json] [--llm]
+    args = [a for a in sys.argv[1:] if a != "--llm"]
+    _bench(args[0] if args else None, "--llm" in sys.argv)
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+import uuid
+from resources import data_path
+
+# 오디오 보관은 선택 사항 (기본 꺼짐)
+AUDIO_ARCHIVE = os.getenv("AUDIO_ARCHIVE", "0") == "1"
+AUDIO_ARCHIVE_DIR = os.getenv("AUDIO_ARCHIVE_DIR", data_path("audio_archive"))
+AUDIO_ARCHIVE_RETENTION_HOURS = float(os.getenv("AUDIO_ARCHIVE_RETENTION_HOURS", "24"))
+AUDIO_ARCHIVE_MAX_FILES = int(os.getenv("AUDIO_ARCHIVE_MAX_FILES", "500"))
+AUDIO_ARCHIVE_CLEANUP_EVERY = int(os.getenv("AUDIO_ARCHIVE_CLEANUP_EVERY", "50"))  # 이 개수를 저장할 때마다 정리
+
+_PREFIX = "segment-"  # 이 모듈이 저장한 파일만 정리 대상
+_lock = threading.Lock()
+_writes = 0
+
+
+def archive_audio(buf, ext: str = "wav"):
+    """보관 모드일 때만 인코딩된 세그먼트 버퍼(BytesIO)를 파일로 저장하고 경로를 반환"""
+    global _writes
+    if not AUDIO_ARCHIVE:
+        return None
+    os.makedirs(AUDIO_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(AUDIO_ARCHIVE_DIR, f"{_PREFIX}{int(time.time())}-{uuid.uuid4()}.{ext}")
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+    with _lock:
+        due = _writes % max(1, AUDIO_ARCHIVE_CLEANUP_EVERY) == 0  # 첫 저장 때도 정리 (이전 실행에서 남은 파일)
+        _writes += 1
+    if due:
+        cleanup_archive()
+    return path
+
+
+def cleanup_archive():
+    """이 모듈이 저장한 segment-* 파일 중 보관 기간이 지난 파일과 최대 개수를 넘는 오래된 파일을 삭제"""
+    if not os.path.isdir(AUDIO_ARCHIVE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(AUDIO_ARCHIVE_DIR):
+        path = os.path.join(AUDIO_ARCHIVE_DIR, name)
+        if name.startswith(_PREFIX) and os.path.isfile(path):
+            entries.append((os.path.getmtime(path), path))
+    entries.sort(reverse=True)  # 최신 파일 먼저
+
+    cutoff = time.time() - AUDIO_ARCHIVE_RETENTION_HOURS * 3600
+    removed = 0
+    for i, (mtime, path) in enumerate(entries):
+        if mtime < cutoff or i >= AUDIO_ARCHIVE_MAX_FILES:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"오디오 보관 파일 삭제 실패: {path}, {e}")
+    return removed
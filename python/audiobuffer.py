@@ -0,0 +1,112 @@
+import time
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    고정 용량 float32 링 버퍼
+
+    내부 배열을 용량의 2배로 잡고 모든 쓰기를 두 위치에 미러링해서,
+    peek()가 항상 연속된 구간의 view(복사 없음)를 돌려줄 수 있도록 합니다.
+    용량을 넘는 쓰기가 들어오면 가장 오래된 샘플부터 덮어씁니다.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity는 0보다 커야 합니다.")
+        self._capacity = int(capacity)
+        self._buf = np.zeros(self._capacity * 2, dtype=np.float32)
+        self._start = 0  # 가장 오래된 샘플 위치 (0 <= start < capacity)
+        self._size = 0
+        self.dropped = 0  # 용량 초과로 버려진 샘플 수
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, samples) -> int:
+        """샘플을 버퍼 끝에 추가하고, 추가된 샘플 수를 반환"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return 0
+        if n > self._capacity:
+            # 용량보다 큰 입력은 뒤쪽만 유지
+            self.dropped += n - self._capacity
+            samples = samples[-self._capacity:]
+            n = self._capacity
+
+        overflow = self._size + n - self._capacity
+        if overflow > 0:
+            self.consume(overflow)
+            self.dropped += overflow
+
+        pos = (self._start + self._size) % self._capacity
+        first = min(n, self._capacity - pos)
+        # 미러링 쓰기: [pos, pos+first)와 [pos+cap, pos+cap+first)
+        self._buf[pos:pos + first] = samples[:first]
+        self._buf[pos + self._capacity:pos + self._capacity + first] = samples[:first]
+        rest = n - first
+        if rest:
+            self._buf[:rest] = samples[first:]
+            self._buf[self._capacity:self._capacity + rest] = samples[first:]
+        self._size += n
+        return n
+
+    def peek(self, n: int = None) -> np.ndarray:
+        """앞쪽 n개 샘플의 읽기 전용 view (복사 없음)"""
+        if n is None or n > self._size:
+            n = self._size
+        view = self._buf[self._start:self._start + n]
+        view.flags.writeable = False
+        return view
+
+    def consume(self, n: int = None) -> int:
+        """앞쪽 n개 샘플을 버리고, 실제로 버린 샘플 수를 반환"""
+        if n is None or n > self._size:
+            n = self._size
+        self._start = (self._start + n) % self._capacity
+        self._size -= n
+        return n
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+def _bench(sample_rate=44100, chunk_frames=1024, window_sec=30):
+    """np.append 누적과 링 버퍼의 청크당 처리 시간 비교 (구간별 평균)"""
+    chunk = np.random.uniform(-1, 1, chunk_frames).astype(np.float32)
+    n_chunks = int(window_sec * sample_rate / chunk_frames)
+
+    def run(write):
+        costs = np.empty(n_chunks)
+        for i in range(n_chunks):
+            t0 = time.perf_counter()
+            write()
+            costs[i] = time.perf_counter() - t0
+        return costs
+
+    acc = np.array([], dtype=np.float32)
+
+    def append():
+        nonlocal acc
+        acc = np.append(acc, chunk)
+
+    ring = AudioRingBuffer(window_sec * sample_rate)
+    append_costs = run(append)
+    ring_costs = run(lambda: ring.write(chunk))
+
+    print(f"청크 {chunk_frames} 샘플, {window_sec}초 윈도우 ({n_chunks} 청크)")
+    span = max(1, n_chunks // 10)
+    for label, lo in (("앞 10%", 0), ("중간 10%", n_chunks // 2 - span // 2), ("끝 10%", n_chunks - span)):
+        a = append_costs[lo:lo + span].mean() * 1e6
+        r = ring_costs[lo:lo + span].mean() * 1e6
+        print(f"  {label:<8} np.append: {a:8.1f}us/청크, ring buffer: {r:6.1f}us/청크")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,92 @@
+import io
+import os
+import threading
+import time
+from math import gcd
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+# 업로드 전 변환 설정
+UPLOAD_FORMAT = os.getenv("STT_UPLOAD_FORMAT", "flac")  # flac | opus | wav
+UPLOAD_SAMPLE_RATE = int(os.getenv("STT_UPLOAD_SAMPLE_RATE", "16000"))
+
+# 포맷별 (soundfile format, subtype, 확장자)
+_FORMATS = {
+    "wav": ("WAV", "PCM_16", "wav"),
+    "flac": ("FLAC", "PCM_16", "flac"),
+    "opus": ("OGG", "OPUS", "ogg"),
+}
+
+# 누적 업로드 통계
+upload_stats = {"segments": 0, "raw_bytes": 0, "sent_bytes": 0, "encode_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def encode_audio(audio, sample_rate, buf=None, fmt=UPLOAD_FORMAT):
+    """
+    오디오를 지정한 포맷으로 메모리 버퍼에 인코딩합니다.
+    buf를 넘기면 비우고 재사용하므로 세그먼트마다 새 버퍼/파일을 만들지 않습니다.
+    """
+    if fmt not in _FORMATS:
+        raise ValueError(f"지원하지 않는 업로드 포맷: {fmt}")
+    sf_format, subtype, ext = _FORMATS[fmt]
+    if buf is None:
+        buf = io.BytesIO()
+    buf.seek(0)
+    buf.truncate(0)
+    sf.write(buf, audio, sample_rate, format=sf_format, subtype=subtype)
+    buf.seek(0)
+    # OpenAI SDK가 파일 확장자로 포맷을 판단하므로 이름을 붙여 둠
+    buf.name = f"segment.{ext}"
+    return buf
+
+
+def to_mono(audio):
+    """(frames, channels) 오디오를 채널 평균으로 모노 다운믹스"""
+    audio = np.asarray(audio)
+    if audio.ndim == 2:
+        if audio.shape[1] == 1:
+            return audio[:, 0]
+        return audio.mean(axis=1, dtype=np.float32)
+    return audio
+
+
+def resample(audio, orig_rate, target_rate=UPLOAD_SAMPLE_RATE):
+    """폴리페이즈 필터로 리샘플링 (예: 44100 -> 16000은 up=160, down=441)"""
+    if orig_rate == target_rate:
+        return audio
+    g = gcd(orig_rate, target_rate)
+    return resample_poly(audio, target_rate // g, orig_rate // g).astype(np.float32)
+
+
+def convert_for_upload(audio, orig_rate, buf=None, fmt=UPLOAD_FORMAT, target_rate=UPLOAD_SAMPLE_RATE):
+    """
+    다운믹스 -> 리샘플링 -> 압축 인코딩을 수행하고 (버퍼, 통계)를 반환합니다.
+    통계에는 원본 PCM_16 기준 바이트 수, 실제 전송 바이트 수, 인코딩 시간이 들어갑니다.
+    """
+    t0 = time.perf_counter()
+    mono = to_mono(audio)
+    if fmt == "opus" and target_rate not in (8000, 12000, 16000, 24000, 48000):
+        target_rate = 16000  # Opus가 지원하는 샘플 레이트로 보정
+    converted = resample(mono, orig_rate, target_rate)
+    buf = encode_audio(converted, target_rate, buf, fmt)
+    elapsed = time.perf_counter() - t0
+
+    raw_bytes = np.asarray(audio).size * 2  # 원본 샘플 레이트/채널의 PCM_16 크기
+    sent_bytes = buf.seek(0, io.SEEK_END)
+    buf.seek(0)
+    with _stats_lock:
+        upload_stats["segments"] += 1
+        upload_stats["raw_bytes"] += raw_bytes
+        upload_stats["sent_bytes"] += sent_bytes
+        upload_stats["encode_seconds"] += elapsed
+    stats = {
+        "format": fmt,
+        "sample_rate": target_rate,
+        "raw_bytes": raw_bytes,
+        "sent_bytes": sent_bytes,
+        "ratio": raw_bytes / sent_bytes if sent_bytes else 0.0,
+        "encode_seconds": elapsed,
+    }
+    return buf, stats
@@ -0,0 +1,51 @@
+import itertools
+import time
+import numpy as np
+
+
+class AudioFrame:
+    """
+    캡처 콜백에서 만들어 audio_q로 전달하는 오디오 프레임
+
+    samples: (frames, channels) 또는 (frames,) 배열
+    timestamp: 첫 샘플의 캡처 시각 (epoch 초)
+    seq: 캡처 스트림 내 순번 (누락 감지용)
+    """
+
+    __slots__ = ("samples", "sample_rate", "channels", "timestamp", "seq")
+
+    def __init__(self, samples, sample_rate, timestamp, seq, channels=None):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.channels = channels if channels is not None else (samples.shape[1] if samples.ndim == 2 else 1)
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def to_float32(self):
+        """int16/int32 샘플을 [-1, 1] float32로 변환"""
+        samples = self.samples
+        if samples.dtype == np.int16:
+            return samples.astype(np.float32) / 32767.0
+        if samples.dtype == np.int32:
+            return samples.astype(np.float32) / 2147483647.0
+        return samples.astype(np.float32, copy=False)
+
+
+class FrameSequencer:
+    """캡처 스트림별 순번/시각을 붙여 AudioFrame을 생성"""
+
+    def __init__(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._seq = itertools.count()
+
+    def make(self, samples, timestamp=None):
+        return AudioFrame(samples, self.sample_rate, timestamp if timestamp is not None else time.time(),
+                          next(self._seq), self.channels)
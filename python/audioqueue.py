@@ -0,0 +1,81 @@
+import queue
+import threading
+import time
+
+AUDIO_QUEUE_TIMEOUT = 0.5  # 블로킹 대기 최대 시간 (초), 깨어나서 할 일이 없으면 다시 대기
+
+
+def drain(q, stop, timeout=AUDIO_QUEUE_TIMEOUT):
+    """
+    큐에 항목이 들어올 때까지 블로킹으로 기다린 뒤, 그 시점에 쌓여 있는 항목을 한 번에 모두 꺼냅니다.
+
+    반환: (items, stopped) - stop 센티널을 만나면 stopped=True이고 센티널 이후 항목은 남겨 둡니다.
+    타임아웃이면 ([], False)
+    """
+    try:
+        item = q.get(timeout=timeout)
+    except queue.Empty:
+        return [], False
+    items = []
+    while True:
+        if item is stop:
+            return items, True
+        items.append(item)
+        try:
+            item = q.get_nowait()
+        except queue.Empty:
+            return items, False
+
+
+def _bench(seconds=2.0, chunk_interval=0.023):
+    """busy-polling(empty()+sleep 10ms)과 블로킹 drain의 유휴 CPU, 전달 지연 비교"""
+    stop = object()
+
+    def run(consumer):
+        q = queue.Queue()
+        latencies = []
+        cpu = {}
+
+        def worker():
+            t0 = time.thread_time()
+            consumer(q, latencies)
+            cpu["seconds"] = time.thread_time() - t0
+
+        t = threading.Thread(target=worker)
+        t.start()
+        # 유휴 구간 후, 오디오 콜백처럼 일정 간격으로 청크 투입
+        time.sleep(seconds)
+        for _ in range(int(seconds / chunk_interval)):
+            q.put(time.perf_counter())
+            time.sleep(chunk_interval)
+        q.put(stop)
+        t.join()
+        latencies.sort()
+        return cpu["seconds"], latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+    def polling(q, latencies):
+        while True:
+            if q.empty():
+                time.sleep(0.01)
+                continue
+            item = q.get()
+            if item is stop:
+                break
+            latencies.append(time.perf_counter() - item)
+
+    def blocking(q, latencies):
+        while True:
+            items, stopped = drain(q, stop)
+            now = time.perf_counter()
+            latencies.extend(now - item for item in items)
+            if stopped:
+                break
+
+    for name, consumer in (("polling", polling), ("blocking drain", blocking)):
+        cpu, p50, p99 = run(consumer)
+        print(f"{name:<15} consumer CPU {cpu * 1000:7.2f}ms / {seconds * 2:.0f}초, "
+              f"지연 p50 {p50 * 1000:6.2f}ms, p99 {p99 * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -1,8 +1,21 @@
-import azure.cognitiveservices.speech as speechsdk
+import time
+from speakerregistry import SpeakerRegistry
+from windowsummary import format_offset
 
 speakers = {}  # {speaker_id: label}
-label_map = {}  # {label: 이름 맵핑, 필요시 사용}
-meeting_log = []  # [(speaker, text, source)] 형태
+label_map = {}  # {label: 이름}, speaker_registry가 자기소개를 감지해서 채움
+meeting_log = []  # [(speaker, text, source)] 형태, start/time은 회의 시작 기준 오디오 offset, _start/_end는 발화 시각(epoch 초)
+session_start = None  # Azure 전사 시작 시각 (result.offset 기준점)
+speaker_registry = SpeakerRegistry(label_map)
+
+def mark_session_start():
+    """start_transcribing_async() 직전에 호출해서 발화 offset을 벽시계 시각으로 환산할 기준점 기록"""
+    global session_start
+    session_start = time.time()
+    # 새 회의: Azure 화자 ID가 새로 매겨지므로 라벨/이름 매핑 초기화
+    speakers.clear()
+    speaker_registry.reset()
+
 def get_speaker_label(speaker_id):
     """speaker_id가 없으면 Unknown, 없으면 새 라벨 생성"""
     if not speaker_id:
@@ -16,6 +29,9 @@ def handle_transcribed(evt):
     """
     Azure ConversationTranscriber transcribed 이벤트 처리
     """
+    # Azure SDK는 실시간 회의를 시작해야 필요하므로 여기서 import
+    import azure.cognitiveservices.speech as speechsdk
+
     # print("evt: ", evt)
     result = evt.result
     # print(result)  # 디버깅용
@@ -23,16 +39,24 @@ def handle_transcribed(evt):
     if result.reason == speechsdk.ResultReason.RecognizedSpeech:
         speaker_id = getattr(result, "speaker_id", None)
         label = get_speaker_label(speaker_id)
-        name = label_map.get(label, f"화자 {label}")
-
         text = getattr(result, "text", "")
+        # 자기소개 후보만 기억 (Azure 이벤트 스레드이므로 LLM 확인과 등록은 Whisper 병합 쪽에서)
+        name = speaker_registry.observe(label, text, use_llm=False) or f"화자 {label}"
+
         if text.strip():
             # print(f"[Azure Speaker {name}] {text}")
-            meeting_log.append({
+            entry = {
                 "speaker": name,
                 "text": text,
-                "source": "Azure"
-            })
+                "source": "Azure",
+                # offset/duration은 100ns 단위
+                "start": round(result.offset / 1e7, 1),
+                "time": format_offset(result.offset / 1e7),
+            }
+            if session_start is not None:
+                entry["_start"] = session_start + result.offset / 1e7
+                entry["_end"] = entry["_start"] + result.duration / 1e7
+            meeting_log.append(entry)
 
             # LangChain에 문서 추가
             chunks = splitter.split_text(f"[{name}] {text}")
@@ -8,8 +8,12 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 import html2text
 import os, io, time, requests, textwrap
 from typing import List, Dict
-from bs4 import BeautifulSoup
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import resources
+import llmclient
+import llmusage
+import asyncio
+from confluencefetch import fetch_pages, html_to_markdown
 
 SITE='https://lgucorp.atlassian.net'
 markdown_converter = html2text.HTML2Text()
@@ -20,10 +24,20 @@ VS_ID = os.getenv("VS_ID","")
 
 http_client = httpx.Client(verify=False)
 
-client = OpenAI(api_key=CHATGPT_API_KEY, http_client=http_client)
-def call_chatgpt(system_prompt, user_prompt):
+resources.register("common.openai_client", lambda: OpenAI(api_key=CHATGPT_API_KEY, http_client=http_client))
+
+def get_client():
+    return resources.get("common.openai_client")
+
+# 채팅 요청은 공용 LLM 클라이언트의 커넥션 풀(verify=False)과 동시 실행 제한/재시도를 사용
+resources.register("common.async_openai_client", lambda: AsyncOpenAI(
+    api_key=CHATGPT_API_KEY, http_client=llmclient.get_http_client(verify=False), max_retries=0))
 
-    resp = client.chat.completions.create(
+def get_async_client():
+    return resources.get("common.async_openai_client")
+
+async def _chat_completion(system_prompt, user_prompt):
+    resp = await llmclient.limited(model="gpt-4o-mini", request=lambda: get_async_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -31,9 +45,15 @@ def call_chatgpt(system_prompt, user_prompt):
         ],
         temperature=1.0,
         max_tokens=400
-    )
+    ))
     return resp.choices[0].message.content
 
+async def acall_chatgpt(system_prompt, user_prompt, site="common.call_chatgpt"):
+    return await llmclient.arun(_chat_completion(system_prompt, user_prompt), site)
+
+def call_chatgpt(system_prompt, user_prompt, site="common.call_chatgpt"):
+    return llmclient.run(_chat_completion(system_prompt, user_prompt), site)
+
 
 
 def confluence_search(space_key: str, label: str = "", limit: int = 50) -> List[Dict]:
@@ -87,22 +107,8 @@ def confluence_get_body_view(page_id: str) -> Dict[str, str]:
     html = ((data.get("body") or {}).get("view") or {}).get("value", "")
     title = data.get("title", f"page-{page_id}")
     webui_link = f"{SITE}/wiki/spaces/{(data.get('space') or {}).get('key')}/pages/{page_id}"
-    return {"title": title, "html": html, "url": webui_link}
-
-def html_to_markdown(html: str) -> str:
-    """
-    간단 변환: HTML → 텍스트(마크다운풍)
-    (정밀 마크다운 변환이 필요하면 html2text 사용 권장)
-    """
-    soup = BeautifulSoup(html, "html.parser")
-    # 코드 블록/표 등은 단순 텍스트화(필요시 커스텀)
-    for br in soup.find_all("br"):
-        br.replace_with("\n")
-    text = soup.get_text("\n")
-    # 연속 개행/공백 정리
-    lines = [l.rstrip() for l in text.splitlines()]
-    compact = "\n".join([l for l in lines if l.strip() != ""])
-    return compact
+    version = (data.get("version") or {}).get("number")
+    return {"title": title, "html": html, "url": webui_link, "version": version}
 
 def write_markdown_file(title: str, url: str, page_id: str, body_md: str) -> io.BytesIO:
     """
@@ -125,27 +131,31 @@ def ensure_vector_store() -> str:
     if vs_id:
         # 기존 것 재사용
         return vs_id
-    vs = client.vector_stores.create(name=f"conf-{CHATGPT_API_KEY or 'all'}")
+    vs = get_client().vector_stores.create(name=f"conf-{CHATGPT_API_KEY or 'all'}")
     return vs.id
 
 def upload_pages_to_vector_store(vs_id: str, pages: List[Dict]):
     """
     Confluence 페이지들을 .md로 변환해 Vector Store에 업로드
     """
-    for p in pages:
-        page = confluence_get_body_view(p["id"])
-        md = html_to_markdown(page["html"])
+    # 본문은 동시에 가져와 변환하고, 업로드만 순서대로
+    fetched, _ = asyncio.run(fetch_pages([p["id"] for p in pages]))
+    for p, page in zip(pages, fetched):
+        if page is None:
+            continue
+        md = page["text"]
         if not md.strip():
             continue
         file_bytes = write_markdown_file(page["title"], page["url"], p["id"], md)
         # 파일명에 pageId를 넣어 추적
         fname = f"{p['id']}_{page['title'].replace('/', '_')}.md"
         print("fname : " + fname)
-        up = client.files.create(file=(fname, file_bytes), purpose="assistants")
-        client.vector_stores.files.create(vector_store_id=vs_id, file_id=up.id)
+        up = get_client().files.create(file=(fname, file_bytes), purpose="assistants")
+        get_client().vector_stores.files.create(vector_store_id=vs_id, file_id=up.id)
 
 def ask_with_file_search(vs_id: str, question: str) -> str:
-    resp = client.responses.create(
+    t0 = time.perf_counter()
+    resp = get_client().responses.create(
         model="gpt-4.1-mini",
         input=[
             {
@@ -167,25 +177,27 @@ def ask_with_file_search(vs_id: str, question: str) -> str:
         ],
         tools=[{"type": "file_search", "vector_store_ids": [vs_id]}],
     )
+    prompt_tokens, completion_tokens, model = llmusage.usage_of(resp)
+    llmusage.record(model or "gpt-4.1-mini", prompt_tokens, completion_tokens, time.perf_counter() - t0, site="common.file_search")
     return resp.output_text
 
 def delete_vs_and_files(vs_id: str):
     all_file_ids = []
-    resp = client.vector_stores.files.list(vector_store_id=vs_id)
+    resp = get_client().vector_stores.files.list(vector_store_id=vs_id)
     for f in resp.data:
         # 실제 file_id는 여기서 가져오기
         fid = getattr(f, "file_id", None) or getattr(f, "id", None)
         name = getattr(f, "filename", None)
         all_file_ids.append((fid, name))
         # 먼저 Vector Store에서 연결 제거
-        client.vector_stores.files.delete(vector_store_id=vs_id, file_id=f.id)
+        get_client().vector_stores.files.delete(vector_store_id=vs_id, file_id=f.id)
 
     # 이제 File 스토리지에서도 삭제
     for fid, name in all_file_ids:
         if not fid:
             continue
         try:
-            client.files.delete(fid)
+            get_client().files.delete(fid)
             print("Deleted file object:", name or fid)
         except Exception as e:
             print("Delete failed:", fid, e)
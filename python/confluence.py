@@ -9,6 +9,7 @@ load_dotenv()
 SITE = "https://lgucorp.atlassian.net"
 CONFLUENCE_TOKEN = os.getenv("CONFLUENCE_TOKEN", "")
 CONFLUENCE_EMAIL = os.getenv("CONFLUENCE_EMAIL", "")
+SEARCH_MAX_RESULTS = int(os.getenv("CONFLUENCE_SEARCH_MAX_RESULTS", "5000"))  # 라벨 검색 결과 상한
 
 def get_content_by_title(title):
     url = f"https://lgucorp.atlassian.net/wiki/rest/api/content?expand=version"
@@ -108,11 +109,40 @@ def post_label(id, content):
         print(f"An error occurred: {e}")
 
 def search_pages_by_label_in_space(label: str, space_key: str, limit: int = 50):
+    pages, _ = list_pages_by_label_in_space(label, space_key, limit)
+    return pages
+
+def list_pages_by_label_in_space(label: str, space_key: str, limit: int = 50, max_results: int = SEARCH_MAX_RESULTS):
+    """
+    라벨이 붙은 페이지를 _links.next를 따라 끝까지 가져옵니다 (limit은 요청 한 번의 개수).
+    반환: (페이지 목록, 목록이 완전한지) - 중간 페이지 요청이 실패하거나 max_results에서 멈추면 False
+    """
     cql = f'type=page AND label="{label}" AND space="{space_key}"'
-    url = f"https://lgucorp.atlassian.net/wiki/rest/api/content/search"
-    r = requests.get(url, params={"cql": cql, "limit": limit}, auth=(CONFLUENCE_EMAIL, CONFLUENCE_TOKEN), verify=False)
-    r.raise_for_status()
-    return [{"id": i["id"], "title": i["title"], "url": i["_links"].get("webui")} for i in r.json().get("results", [])]
+    url = f"{SITE}/wiki/rest/api/content/search"
+    params = {"cql": cql, "limit": limit, "expand": "version"}
+    auth = (CONFLUENCE_EMAIL, CONFLUENCE_TOKEN)
+    pages = []
+    while True:
+        try:
+            r = requests.get(url, params=params, auth=auth, verify=False)
+            r.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if not pages:
+                raise
+            print(f"라벨 검색 중단 ({label}, {len(pages)}개까지): {e}")
+            return pages, False
+        data = r.json()
+        # version: 페이지 버전 번호 (변경된 페이지만 다시 임베딩할 때 사용)
+        pages.extend({"id": i["id"], "title": i["title"], "url": i["_links"].get("webui"),
+                      "version": (i.get("version") or {}).get("number")}
+                     for i in data.get("results", []))
+        links = data.get("_links") or {}
+        if not links.get("next"):
+            return pages, True
+        if len(pages) >= max_results:
+            print(f"라벨 검색 결과가 {max_results}개를 넘어 중단 ({label})")
+            return pages, False
+        url, params = (links.get("base") or f"{SITE}/wiki") + links["next"], None  # next에 cql/start가 들어 있음
 
 def delete_label(id, content):
     url = f"https://lgucorp.atlassian.net/wiki/rest/api/content/{id}/label/{content}"
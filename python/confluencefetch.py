@@ -0,0 +1,223 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from bs4 import BeautifulSoup
+import resources
+
+# RAG 수집용 Confluence 페이지 동시 가져오기 설정
+SITE = "https://lgucorp.atlassian.net"
+CONFLUENCE_TOKEN = os.getenv("CONFLUENCE_TOKEN", "")
+CONFLUENCE_EMAIL = os.getenv("CONFLUENCE_EMAIL", "")
+FETCH_CONCURRENCY = int(os.getenv("CONFLUENCE_FETCH_CONCURRENCY", "8"))  # 동시에 보내는 페이지 요청 수
+FETCH_TIMEOUT = float(os.getenv("CONFLUENCE_FETCH_TIMEOUT", "30"))
+FETCH_MAX_RETRIES = int(os.getenv("CONFLUENCE_FETCH_MAX_RETRIES", "5"))
+FETCH_BACKOFF_BASE = float(os.getenv("CONFLUENCE_FETCH_BACKOFF_BASE", "0.5"))  # 재시도 대기: base * 2^n (+ jitter)
+FETCH_BACKOFF_MAX = float(os.getenv("CONFLUENCE_FETCH_BACKOFF_MAX", "30"))
+CONVERT_WORKERS = int(os.getenv("HTML_CONVERT_WORKERS", str(min(4, os.cpu_count() or 1))))  # HTML 변환 프로세스 수
+
+
+def html_to_markdown(html: str) -> str:
+    """
+    간단 변환: HTML → 텍스트(마크다운풍)
+    (정밀 마크다운 변환이 필요하면 html2text 사용 권장)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    # 코드 블록/표 등은 단순 텍스트화(필요시 커스텀)
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    text = soup.get_text("\n")
+    # 연속 개행/공백 정리
+    lines = [l.rstrip() for l in text.splitlines()]
+    compact = "\n".join([l for l in lines if l.strip() != ""])
+    return compact
+
+
+# HTML 파싱은 CPU 작업이라 이벤트 루프/GIL을 막지 않도록 프로세스 풀에서 (이 모듈만 import하는 가벼운 worker)
+resources.register("confluence.convert_pool", lambda: ProcessPoolExecutor(max_workers=CONVERT_WORKERS))
+
+
+def _retry_after(response):
+    # Retry-After(초)가 있으면 그만큼, 없으면 None
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt):
+    delay = min(FETCH_BACKOFF_MAX, FETCH_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+class PageFetcher:
+    """
+    페이지 본문을 공용 커넥션 풀(httpx.AsyncClient)로 동시에 가져오고, 받는 대로 프로세스 풀에서 텍스트로 변환합니다.
+
+    - 동시 요청은 concurrency개로 제한합니다.
+    - 429/5xx/네트워크 오류는 지수 backoff로 재시도하고, 429의 Retry-After 동안은 모든 요청을 멈춥니다.
+    - stats: 페이지 수, 재시도, 429 횟수, 실패, 걸린 시간, 초당 페이지 수
+    """
+
+    def __init__(self, site=SITE, auth=None, concurrency=FETCH_CONCURRENCY, max_retries=FETCH_MAX_RETRIES,
+                 convert_pool=None, verify=False):
+        self.site = site
+        self.auth = auth if auth is not None else (CONFLUENCE_EMAIL, CONFLUENCE_TOKEN)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.convert_pool = convert_pool
+        self.verify = verify
+        self._resume_at = 0.0  # 429 Retry-After로 요청을 멈출 시각 (loop.time 기준)
+        self.stats = {}
+
+    async def _get_json(self, client, semaphore, url, params):
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            wait = self._resume_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with semaphore:
+                try:
+                    response = await client.get(url, params=params)
+                except httpx.TransportError as e:
+                    response, error, delay = None, e, None
+            if response is not None:
+                if response.status_code == 429 or response.status_code >= 500:
+                    error = httpx.HTTPStatusError(f"{response.status_code}", request=response.request, response=response)
+                    delay = _retry_after(response)
+                    if response.status_code == 429:
+                        self.stats["rate_limited"] += 1
+                        if delay is not None:
+                            self._resume_at = max(self._resume_at, loop.time() + delay)
+                else:
+                    response.raise_for_status()
+                    return response.json()
+            if attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay if delay is not None else _backoff(attempt))
+
+    async def _fetch_one(self, client, semaphore, page_id):
+        data = await self._get_json(client, semaphore, f"{self.site}/wiki/rest/api/content/{page_id}",
+                                    {"expand": "body.view,version,space"})
+        html = ((data.get("body") or {}).get("view") or {}).get("value", "")
+        page = {
+            "id": str(page_id),
+            "title": data.get("title", f"page-{page_id}"),
+            "url": f"{self.site}/wiki/spaces/{(data.get('space') or {}).get('key')}/pages/{page_id}",
+            "version": (data.get("version") or {}).get("number"),
+        }
+        if self.convert_pool is not None:
+            page["text"] = await asyncio.get_running_loop().run_in_executor(self.convert_pool, html_to_markdown, html)
+        else:
+            page["text"] = html_to_markdown(html)
+        return page
+
+    async def fetch(self, page_ids):
+        """
+        page_ids 순서대로 {"id", "title", "url", "version", "text"}를 반환 (실패한 페이지는 None)
+        """
+        self.stats = {"pages": len(page_ids), "fetched": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+        t0 = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(auth=self.auth, verify=self.verify, limits=limits,
+                                     timeout=httpx.Timeout(FETCH_TIMEOUT, connect=10.0)) as client:
+            async def one(page_id):
+                try:
+                    page = await self._fetch_one(client, semaphore, page_id)
+                    self.stats["fetched"] += 1
+                    return page
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    print(f"페이지 {page_id} 가져오기 실패: {e!r}")
+                    return None
+            pages = await asyncio.gather(*(one(page_id) for page_id in page_ids))
+        seconds = time.perf_counter() - t0
+        self.stats["seconds"] = round(seconds, 3)
+        self.stats["pages_per_sec"] = round(self.stats["fetched"] / seconds, 1) if seconds > 0 else 0.0
+        print(f"Confluence 페이지 가져오기: {self.stats}")
+        return pages
+
+
+async def fetch_pages(page_ids, **kwargs):
+    """페이지들을 동시에 가져와 텍스트로 변환 (변환은 공용 프로세스 풀). 반환: (페이지 목록, 통계)"""
+    if "convert_pool" not in kwargs:
+        kwargs["convert_pool"] = resources.get("confluence.convert_pool")
+    fetcher = PageFetcher(**kwargs)
+    pages = await fetcher.fetch(page_ids)
+    return pages, fetcher.stats
+
+
+def _bench(n_pages=200, latency=0.05, rate_limit_every=40):
+    """
+    로컬 Confluence 대역 서버로 순차(페이지마다 새 연결) vs 동시 가져오기 비교
+    python confluencefetch.py [페이지 수]
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = "<h1>회의록</h1>" + "".join(f"<p>논의 {i}: 일정과 담당자를 확인했습니다.<br>결정 사항 {i}</p>" for i in range(300))
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with lock:
+                counter["n"] += 1
+                limited = rate_limit_every and counter["n"] % rate_limit_every == 0
+            if limited:
+                self.send_response(429)
+                self.send_header("Retry-After", "0.2")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(latency)
+            page_id = self.path.split("/")[-1].split("?")[0]
+            data = json.dumps({"id": page_id, "title": f"회의록 {page_id}", "version": {"number": 1},
+                               "space": {"key": "UMEET"}, "body": {"view": {"value": body}}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site = f"http://127.0.0.1:{server.server_address[1]}"
+    page_ids = [str(i) for i in range(n_pages)]
+
+    # 기존 방식: 페이지마다 새 연결로 요청하고 같은 스레드에서 변환
+    t0 = time.perf_counter()
+    for page_id in page_ids:
+        while True:
+            r = httpx.get(f"{site}/wiki/rest/api/content/{page_id}", params={"expand": "body.view,version,space"})
+            if r.status_code != 429:
+                break
+            time.sleep(float(r.headers["Retry-After"]))
+        html_to_markdown(r.json()["body"]["view"]["value"])
+    sequential = time.perf_counter() - t0
+    print(f"순차: {n_pages}페이지 {sequential:.2f}초 ({n_pages / sequential:.1f} pages/s)")
+
+    with ProcessPoolExecutor(max_workers=CONVERT_WORKERS) as pool:
+        pages, stats = asyncio.run(fetch_pages(page_ids, site=site, auth=("", ""), convert_pool=pool))
+    assert all(p is not None and p["text"] for p in pages)
+    print(f"동시({FETCH_CONCURRENCY}) + 변환 프로세스 {CONVERT_WORKERS}개: {n_pages}페이지 {stats['seconds']:.2f}초 "
+          f"({stats['pages_per_sec']} pages/s, 재시도 {stats['retries']}, 429 {stats['rate_limited']})")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
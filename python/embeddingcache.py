@@ -0,0 +1,84 @@
+import hashlib
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from lrustore import LRUStore
+from resources import data_path
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", data_path("embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+class EmbeddingCache:
+    """
+    임베딩 모델 + 청크 텍스트 해시를 키로 벡터(float32)를 SQLite에 저장합니다.
+
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 벡터부터 지웁니다 (LRUStore).
+    - 모델별 hit/miss를 집계합니다.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_BYTES):
+        self.store = LRUStore(path, "embedding_cache", max_bytes, kind_column="model", value_column="vector",
+                              label="임베딩 캐시")
+
+    @staticmethod
+    def key(model, text):
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, model, texts):
+        """texts 순서대로 캐시된 벡터(list[float]) 또는 None"""
+        keys = [self.key(model, text) for text in texts]
+        found = self.store.get_many(keys, model)
+        return [np.frombuffer(found[k], dtype=np.float32).tolist() if k in found else None for k in keys]
+
+    def put_many(self, model, texts, vectors):
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.key(model, text), model, blob, len(blob)))
+        self.store.put_many(rows)
+
+    def stats(self):
+        stats = self.store.stats()
+        stats["models"] = stats.pop("kinds")
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """캐시에 없는 청크만 실제 임베딩 모델(OpenAIEmbeddings 등)로 보내는 래퍼"""
+
+    def __init__(self, embeddings, cache, model=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def _missing(self, texts):
+        vectors = self.cache.get_many(self.model, texts)
+        # 같은 배치 안의 중복 텍스트는 한 번만 임베딩
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        return vectors, missing
+
+    def _fill(self, texts, vectors, missing, embedded):
+        self.cache.put_many(self.model, missing, embedded)
+        by_text = dict(zip(missing, embedded))
+        return [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+    def embed_documents(self, texts):
+        vectors, missing = self._missing(texts)
+        embedded = self.embeddings.embed_documents(missing) if missing else []
+        return self._fill(texts, vectors, missing, embedded)
+
+    async def aembed_documents(self, texts):
+        vectors, missing = self._missing(texts)
+        embedded = await self.embeddings.aembed_documents(missing) if missing else []
+        return self._fill(texts, vectors, missing, embedded)
+
+    def embed_query(self, text):
+        # 질문은 매번 달라서 캐시하지 않음
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        return await self.embeddings.aembed_query(text)
+
+
+embedding_cache = EmbeddingCache()
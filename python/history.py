@@ -1,3 +1,4 @@
+import asyncio
 import confluence as confluence
 import common as common
 import urllib3
@@ -8,7 +9,7 @@ import html2text
 markdown_converter = html2text.HTML2Text()
 SITE = "https://lgucorp.atlassian.net/wiki"
 
-def main():
+async def main():
     label_title_list = ['기본기강화', 'UMEET주간회의']
 
 
@@ -31,7 +32,7 @@ def main():
                 user_prompt += (((data.get("body") or {}).get("storage") or {}).get("value") or "")
                 url += f"""<p><a href="{SITE}{page['url']}">{page['title']}</a></p>\n"""
 
-            answer = common.call_chatgpt(system_prompt, user_prompt)
+            answer = await common.acall_chatgpt(system_prompt, user_prompt, site="history")
             comment = answer
             comment += page['title']+' 요약\n\n'
             comment += url
@@ -42,5 +43,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
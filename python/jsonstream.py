@@ -0,0 +1,93 @@
+import json
+import time
+
+
+class JsonArrayStream:
+    """
+    LLM 스트리밍 응답을 조각(chunk) 단위로 받아, 배열 안의 JSON 객체가 완성되는 즉시 꺼냅니다.
+
+    - [{...}, {...}] 와 {"utterances": [{...}, ...]} 둘 다 처리합니다 (배열의 원소인 객체만 반환).
+    - 첫 '[' 또는 '{' 전의 텍스트(설명, 마크다운 펜스)는 무시합니다.
+    - 문자열 안의 괄호/따옴표는 escape까지 고려해서 건너뜁니다.
+    """
+
+    def __init__(self):
+        self._stack = []  # 열린 '{' / '['
+        self._in_string = False
+        self._escape = False
+        self._capture = None  # 현재 모으고 있는 배열 원소 객체의 문자들
+        self._capture_depth = 0
+        self.items = 0
+        self.errors = 0
+
+    def feed(self, chunk):
+        """조각을 넣고, 이번 조각으로 완성된 객체 리스트를 반환"""
+        completed = []
+        for ch in chunk or "":
+            if self._capture is not None:
+                self._capture.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch in "[{":
+                if ch == "{" and self._capture is None and self._stack and self._stack[-1] == "[":
+                    self._capture = [ch]
+                    self._capture_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "]}":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._capture is not None and ch == "}" and len(self._stack) == self._capture_depth:
+                    text = "".join(self._capture)
+                    self._capture = None
+                    try:
+                        item = json.loads(text)
+                    except json.JSONDecodeError:
+                        self.errors += 1
+                        continue
+                    self.items += 1
+                    completed.append(item)
+        return completed
+
+    @property
+    def done(self):
+        """최상위 배열/객체가 닫혔는지"""
+        return not self._stack and self.items > 0
+
+
+def _bench(n_items=20, chunk_size=4, chunk_delay=0.002):
+    """토큰 스트리밍을 흉내내서, 전체 응답을 기다렸다 파싱할 때와 첫 발화까지 걸리는 시간 비교"""
+    body = json.dumps({"utterances": [
+        {"speaker": f"화자 {chr(65 + i % 3)}", "text": f"{i}번째 발화 내용입니다. \"인용\" {{괄호}}", "source": "Whisper"}
+        for i in range(n_items)
+    ]}, ensure_ascii=False)
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    parser = JsonArrayStream()
+    t0 = time.perf_counter()
+    first = None
+    received = []
+    for chunk in chunks:
+        time.sleep(chunk_delay)
+        for item in parser.feed(chunk):
+            if first is None:
+                first = time.perf_counter() - t0
+            received.append(item)
+    total = time.perf_counter() - t0
+    assert received == json.loads(body)["utterances"]
+    print(f"조각 {len(chunks)}개, 발화 {len(received)}개")
+    print(f"스트리밍 파싱: 첫 발화 {first * 1000:.0f}ms, 마지막 발화 {total * 1000:.0f}ms")
+    print(f"전체 응답 후 json.loads: 첫 발화 {total * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+import httpx
+from langchain_openai import ChatOpenAI
+import resources
+import llmusage
+
+# 공용 LLM 클라이언트 설정
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # 동시에 진행하는 LLM 요청 수
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))  # 공용 커넥션 풀 크기
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # 요청 하나의 제한 시간 (초)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))  # 재시도 대기: base * 2^n (+ jitter)
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+_END = object()
+
+stats = {"calls": 0, "in_flight": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+
+class _LLMLoop:
+    """
+    모든 LLM 요청을 처리하는 전용 이벤트 루프 스레드
+
+    async 핸들러, 파이프라인 worker 스레드, CLI 스크립트 어디서 호출하든 요청은 이 루프 하나에서
+    공용 httpx.AsyncClient 풀과 세마포어를 공유합니다. 호출한 쪽은 결과를 기다리기만 합니다.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = None
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="llm-loop", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        ready.set()
+        self.loop.run_forever()
+
+
+def _build_http_client(verify):
+    return httpx.AsyncClient(
+        verify=verify,
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+    )
+
+
+resources.register("llm.loop", _LLMLoop)
+resources.register("llm.http", lambda: _build_http_client(True))
+resources.register("llm.http_insecure", lambda: _build_http_client(False))  # common(사내 프록시)과 같은 verify=False
+
+
+def get_loop():
+    return resources.get("llm.loop")
+
+
+def get_http_client(verify=True):
+    """공용 비동기 커넥션 풀 (llm 루프에서만 사용)"""
+    return resources.get("llm.http" if verify else "llm.http_insecure")
+
+
+def _retryable(e):
+    import openai
+    if isinstance(e, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(e, openai.APIConnectionError):  # 타임아웃 포함
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code in (408, 409, 429) or e.status_code >= 500
+    return False
+
+
+def _backoff(attempt):
+    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+async def limited(request, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES, model=None):
+    """
+    llm 루프에서 request()(코루틴을 만드는 함수)를 동시 실행 제한, 제한 시간, 재시도(지수 backoff)와 함께 실행
+    성공/실패한 요청마다 llmusage에 토큰, 지연 시간, 모델을 기록합니다.
+    """
+    semaphore = get_loop().semaphore
+    attempt = 0
+    while True:
+        async with semaphore:
+            stats["calls"] += 1
+            stats["in_flight"] += 1
+            t0 = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(request(), timeout)
+                prompt_tokens, completion_tokens, result_model = llmusage.usage_of(result)
+                llmusage.record(result_model or model, prompt_tokens, completion_tokens, time.perf_counter() - t0)
+                return result
+            except Exception as e:
+                error = e
+                llmusage.record(model, 0, 0, time.perf_counter() - t0, ok=False)
+            finally:
+                stats["in_flight"] -= 1
+        if isinstance(error, asyncio.TimeoutError):
+            stats["timeouts"] += 1
+        if attempt >= max_retries or not _retryable(error):
+            stats["failures"] += 1
+            raise error
+        attempt += 1
+        stats["retries"] += 1
+        delay = _backoff(attempt)
+        print(f"LLM 요청 재시도 {attempt}/{max_retries} ({delay:.1f}초 후): {error!r}")
+        await asyncio.sleep(delay)
+
+
+class LimitedChatOpenAI(ChatOpenAI):
+    """공용 풀/세마포어/재시도를 거치는 ChatOpenAI (llm 루프에서만 호출)"""
+
+    async def _agenerate(self, *args, **kwargs):
+        return await limited(lambda: super(LimitedChatOpenAI, self)._agenerate(*args, **kwargs), model=self.model_name)
+
+    async def _astream(self, *args, **kwargs):
+        # 스트리밍은 첫 조각을 받기 전에 실패한 경우만 재시도
+        semaphore = get_loop().semaphore
+        attempt = 0
+        while True:
+            started = False
+            usage = [0, 0]
+            t0 = time.perf_counter()
+            try:
+                async with semaphore:
+                    stats["calls"] += 1
+                    stats["in_flight"] += 1
+                    try:
+                        async for chunk in super()._astream(*args, **kwargs):
+                            started = True
+                            # stream_usage=True이면 마지막 조각에 사용량이 옴
+                            chunk_usage = getattr(chunk.message, "usage_metadata", None)
+                            if chunk_usage:
+                                usage[0] += chunk_usage.get("input_tokens", 0)
+                                usage[1] += chunk_usage.get("output_tokens", 0)
+                            yield chunk
+                    finally:
+                        stats["in_flight"] -= 1
+                llmusage.record(self.model_name, usage[0], usage[1], time.perf_counter() - t0)
+                return
+            except Exception as e:
+                llmusage.record(self.model_name, usage[0], usage[1], time.perf_counter() - t0, ok=False)
+                if started or attempt >= LLM_MAX_RETRIES or not _retryable(e):
+                    stats["failures"] += 1
+                    raise
+                attempt += 1
+                stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_chat_model(model=LLM_MODEL, **kwargs):
+    """공용 풀을 쓰는 ChatOpenAI (모델/옵션별로 하나씩 재사용)"""
+    key = (model, tuple(sorted(kwargs.items())))
+    with _models_lock:
+        if key not in _models:
+            _models[key] = LimitedChatOpenAI(
+                model=model, http_async_client=get_http_client(), timeout=LLM_TIMEOUT, max_retries=0,
+                stream_usage=True, **kwargs
+            )
+        return _models[key]
+
+
+async def _tagged(tags, coro):
+    with llmusage.tag(**tags):
+        return await coro
+
+
+def submit(coro, site=None):
+    # 호출한 쪽의 사용량 태그(호출 위치/엔드포인트/회의)를 llm 루프 태스크로 넘김
+    tags = llmusage.snapshot()
+    if site is not None:
+        tags["site"] = site
+    return asyncio.run_coroutine_threadsafe(_tagged(tags, coro), get_loop().loop)
+
+
+async def arun(coro, site=None):
+    """async 코드에서: coro를 llm 루프에서 실행하고 결과를 기다림 (이벤트 루프를 막지 않음)"""
+    if asyncio.get_running_loop() is get_loop().loop:
+        with llmusage.tag(site=site):
+            return await coro
+    return await asyncio.wrap_future(submit(coro, site))
+
+
+def run(coro, site=None):
+    """동기 코드(worker 스레드, CLI)에서: coro를 llm 루프에서 실행하고 결과를 기다림"""
+    if threading.current_thread() is get_loop().thread:
+        coro.close()
+        raise RuntimeError("llm 루프 안에서는 await arun()을 사용하세요.")
+    return submit(coro, site).result()
+
+
+async def _chat(messages, model, bind):
+    llm = get_chat_model(model)
+    return await (llm.bind(**bind) if bind else llm).ainvoke(messages)
+
+
+async def achat(messages, model=LLM_MODEL, site=None, **bind):
+    """메시지를 보내고 AIMessage를 반환 (bind: response_format 등, site: 사용량 집계용 호출 위치)"""
+    return await arun(_chat(messages, model, bind), site)
+
+
+def chat(messages, model=LLM_MODEL, site=None, **bind):
+    return run(_chat(messages, model, bind), site)
+
+
+def _pump(messages, model, bind, put):
+    async def pump():
+        try:
+            llm = get_chat_model(model)
+            async for chunk in (llm.bind(**bind) if bind else llm).astream(messages):
+                put((chunk, None))
+            put((_END, None))
+        except BaseException as e:
+            put((_END, e))
+            raise
+    return pump()
+
+
+async def astream(messages, model=LLM_MODEL, site=None, **bind):
+    """llm 루프에서 받은 스트리밍 조각(AIMessageChunk)을 호출한 쪽 루프로 전달"""
+    caller = asyncio.get_running_loop()
+    q = asyncio.Queue()
+    future = submit(_pump(messages, model, bind, lambda item: caller.call_soon_threadsafe(q.put_nowait, item)), site)
+    try:
+        while True:
+            chunk, error = await q.get()
+            if chunk is _END:
+                if error is not None:
+                    raise error
+                return
+            yield chunk
+    finally:
+        future.cancel()
+
+
+def stream(messages, model=LLM_MODEL, site=None, **bind):
+    """동기 코드용 스트리밍 (worker 스레드에서 조각을 받는 대로 처리)"""
+    q = queue.Queue()
+    future = submit(_pump(messages, model, bind, q.put), site)
+    try:
+        while True:
+            chunk, error = q.get()
+            if chunk is _END:
+                if error is not None:
+                    raise error
+                return
+            yield chunk
+    finally:
+        future.cancel()
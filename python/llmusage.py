@@ -0,0 +1,174 @@
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from resources import data_path
+
+# LLM 호출별 토큰/비용 기록
+LLM_USAGE_LOG = os.getenv("LLM_USAGE_LOG", data_path("llm_usage.jsonl"))  # 비우면 파일 기록 안 함
+# 로그는 백그라운드 스레드가 모아서 씀: 이 줄 수가 쌓이거나 이 시간(초)마다 (종료 시에도)
+LLM_USAGE_FLUSH_LINES = int(os.getenv("LLM_USAGE_FLUSH_LINES", "50"))
+LLM_USAGE_FLUSH_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", "10"))
+# 로그 파일이 이 크기를 넘으면 .1로 옮기고 새 파일에 기록 (이전 .1은 덮어씀)
+LLM_USAGE_LOG_MAX_BYTES = int(os.getenv("LLM_USAGE_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+# 1M 토큰당 USD (입력, 출력). LLM_PRICES='{"model": [in, out]}'로 덮어쓰기
+LLM_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+}
+LLM_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+_site = contextvars.ContextVar("llm_site", default=None)  # 호출 위치 (예: noteagent.merge)
+_endpoint = contextvars.ContextVar("llm_endpoint", default=None)  # API 엔드포인트
+_meeting = contextvars.ContextVar("llm_meeting", default=None)  # 회의 (요약 요청의 제목 등)
+current_meeting = None  # 실시간 회의 세션 (컨텍스트에 회의가 없는 worker 스레드 호출용)
+
+_lock = threading.Lock()
+_totals = {"site": {}, "endpoint": {}, "meeting": {}, "model": {}}
+_started = time.time()
+_pending = []  # 아직 파일에 쓰지 않은 로그 줄
+_flush_lock = threading.Lock()  # 파일 쓰기 (집계용 _lock과 분리)
+_flush_requested = threading.Event()
+_writer = None  # 로그 쓰기 스레드 (record()는 LLM 이벤트 루프에서도 불리므로 파일 I/O는 여기서만)
+
+
+@contextmanager
+def tag(site=None, endpoint=None, meeting=None):
+    """with 블록 안의 LLM 호출에 호출 위치/엔드포인트/회의를 붙임 (None이면 바깥 값 유지)"""
+    tokens = []
+    for var, value in ((_site, site), (_endpoint, endpoint), (_meeting, meeting)):
+        if value is not None:
+            tokens.append((var, var.set(value)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def snapshot():
+    """현재 컨텍스트의 태그 (다른 스레드/루프로 넘길 때 사용)"""
+    return {"site": _site.get(), "endpoint": _endpoint.get(), "meeting": _meeting.get()}
+
+
+def start_meeting(meeting_id):
+    global current_meeting
+    current_meeting = meeting_id
+
+
+def cost_of(model, prompt_tokens, completion_tokens):
+    price = None
+    for name in sorted(LLM_PRICES, key=len, reverse=True):  # gpt-4o-mini-2024-07-18 -> gpt-4o-mini
+        if model and model.startswith(name):
+            price = LLM_PRICES[name]
+            break
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+
+
+def usage_of(result):
+    """LangChain ChatResult/AIMessage, OpenAI 응답에서 (입력 토큰, 출력 토큰, 모델) 추출"""
+    generations = getattr(result, "generations", None)
+    message = generations[0].message if generations else result
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        model = (getattr(message, "response_metadata", None) or {}).get("model_name")
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), model
+    usage = getattr(result, "usage", None)
+    if usage is not None:
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if prompt is None:
+            prompt, completion = getattr(usage, "input_tokens", 0), getattr(usage, "output_tokens", 0)
+        return prompt or 0, completion or 0, getattr(result, "model", None)
+    return 0, 0, None
+
+
+def record(model, prompt_tokens, completion_tokens, seconds, ok=True, site=None):
+    """LLM 요청 하나를 집계하고 JSON lines 로그에 남김 (파일 쓰기는 백그라운드 스레드에서)"""
+    entry = {
+        "time": time.time(),
+        "site": site or _site.get() or "unknown",
+        "endpoint": _endpoint.get(),
+        "meeting": _meeting.get() or current_meeting,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "seconds": round(seconds, 3),
+        "cost_usd": cost_of(model, prompt_tokens, completion_tokens),
+        "ok": ok,
+    }
+    with _lock:
+        for kind in _totals:
+            key = entry[kind] or "-"
+            total = _totals[kind].setdefault(key, {
+                "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0, "cost_usd": 0.0,
+            })
+            total["calls"] += 1
+            total["errors"] += 0 if ok else 1
+            total["prompt_tokens"] += prompt_tokens
+            total["completion_tokens"] += completion_tokens
+            total["seconds"] += seconds
+            total["cost_usd"] += entry["cost_usd"]
+        if LLM_USAGE_LOG:
+            _pending.append(json.dumps(entry, ensure_ascii=False) + "\n")
+            _start_writer()
+            if len(_pending) >= LLM_USAGE_FLUSH_LINES:
+                _flush_requested.set()
+    return entry
+
+
+def _start_writer():
+    # _lock 안에서 호출
+    global _writer
+    if _writer is None:
+        _writer = threading.Thread(target=_write_loop, name="llm-usage-log", daemon=True)
+        _writer.start()
+
+
+def _write_loop():
+    while True:
+        _flush_requested.wait(LLM_USAGE_FLUSH_SECONDS)
+        _flush_requested.clear()
+        flush()
+
+
+def flush():
+    """쌓인 사용량 로그를 파일에 씀 (크기가 LLM_USAGE_LOG_MAX_BYTES를 넘으면 먼저 회전)"""
+    global _pending
+    with _flush_lock:
+        with _lock:
+            lines, _pending = _pending, []
+        if not lines or not LLM_USAGE_LOG:
+            return
+        try:
+            os.makedirs(os.path.dirname(LLM_USAGE_LOG) or ".", exist_ok=True)
+            if os.path.exists(LLM_USAGE_LOG) and os.path.getsize(LLM_USAGE_LOG) >= LLM_USAGE_LOG_MAX_BYTES:
+                os.replace(LLM_USAGE_LOG, LLM_USAGE_LOG + ".1")
+            with open(LLM_USAGE_LOG, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        except OSError as e:
+            print(f"LLM 사용량 로그 기록 실패: {e}")
+
+
+atexit.register(flush)
+
+
+def report(meeting=None):
+    """호출 위치/엔드포인트/회의/모델별 합계 (비용 큰 순). meeting을 주면 그 회의 합계만"""
+    with _lock:
+        if meeting is not None:
+            return _totals["meeting"].get(meeting, {})
+        result = {"since": _started, "current_meeting": current_meeting}
+        for kind, totals in _totals.items():
+            result[kind] = dict(sorted(
+                ((k, dict(v, seconds=round(v["seconds"], 3), cost_usd=round(v["cost_usd"], 6))) for k, v in totals.items()),
+                key=lambda item: item[1]["cost_usd"], reverse=True,
+            ))
+        return result
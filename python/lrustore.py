@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class LRUStore:
+    """
+    SummaryCache와 EmbeddingCache가 함께 쓰는 SQLite 저장 계층입니다 (연결, 잠금, LRU 정리, 종류별 hit/miss).
+
+    - 키마다 값과 크기(size), 마지막 사용 시각(last_used)을 table에 저장합니다.
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+    - kind_column에는 항목 종류(요약 kind, 임베딩 모델 등)를 넣고, 종류별 hit/miss를 집계합니다.
+    - SQLite/파일 오류는 출력만 하고 캐시가 없는 것처럼 동작합니다.
+    """
+
+    def __init__(self, path, table, max_bytes, kind_column="kind", value_column="value", label="캐시"):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.kind_column = kind_column
+        self.value_column = value_column
+        self.label = label
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {}  # kind -> {"hits", "misses"}
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f"key TEXT PRIMARY KEY, {self.kind_column} TEXT, {self.value_column} BLOB, size INTEGER, last_used REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, keys, kind):
+        """keys 중 저장된 것만 {key: 값}으로 반환하고 사용 시각을 갱신"""
+        found = {}
+        with self._lock:
+            try:
+                db = self._db()
+                unique = list(dict.fromkeys(keys))
+                for i in range(0, len(unique), 500):  # SQLite 변수 개수 제한
+                    batch = unique[i:i + 500]
+                    found.update(db.execute(
+                        f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall())
+                if found:
+                    now = time.time()
+                    db.executemany(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                    db.commit()
+            except (sqlite3.Error, OSError) as e:
+                print(f"{self.label} 조회 실패: {e}")
+            counter = self.counters.setdefault(kind, {"hits": 0, "misses": 0})
+            hits = sum(1 for k in keys if k in found)
+            counter["hits"] += hits
+            counter["misses"] += len(keys) - hits
+        return found
+
+    def put_many(self, rows):
+        """rows: [(key, kind, 값, 크기(bytes))]"""
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                db.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, {self.kind_column}, {self.value_column}, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(key, kind, value, size, now) for key, kind, value, size in rows],
+                )
+                self._evict(db)
+                db.commit()
+            except (sqlite3.Error, OSError) as e:
+                print(f"{self.label} 저장 실패: {e}")
+
+    def _evict(self, db):
+        total = db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute(f"SELECT key, size FROM {self.table} ORDER BY last_used").fetchall():
+            db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """항목 수/크기와 종류별 hit rate ({"entries", "bytes", "max_bytes", "kinds"})"""
+        with self._lock:
+            try:
+                entries, size = self._db().execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+                ).fetchone()
+            except (sqlite3.Error, OSError):
+                entries, size = 0, 0
+            kinds = {}
+            for kind, counter in self.counters.items():
+                total = counter["hits"] + counter["misses"]
+                kinds[kind] = dict(counter, hit_rate=counter["hits"] / total if total else 0.0)
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "kinds": kinds}
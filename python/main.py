@@ -1,25 +1,43 @@
+import time
+_main_import_start = time.perf_counter()
+import resources
+from resources import timed_import
 import os
-import ms as ms
-import confluence as confluence
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Path
-from noteagent import summarize_all, summarize_meeting_log
-from pydantic import BaseModel, Field
-from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
-import common as common
+with timed_import("fastapi"):
+    from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Path
+    from pydantic import BaseModel, Field
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, StreamingResponse
+with timed_import("ms"):
+    import ms as ms
+with timed_import("confluence"):
+    import confluence as confluence
+with timed_import("noteagent"):
+    from noteagent import summarize_all, summarize_meeting_log, summarize_windows, summary_stats, SUMMARY_PROMPT_VERSION
+    from summarycache import summary_cache
+    from windowsummary import format_log
+with timed_import("common"):
+    import common as common
+with timed_import("llmclient"):
+    import llmclient
+import llmusage
 import html2text
-import httpx
-from qnaagent import ask_agent
-from qnaagent import ask_agent, terminal_chat_with_agent
-from recordingaudio import conversation_transcriber, start_audio_capture
-from azurespeech import canceled_handler, handle_transcribed, meeting_log
-from langchain_openai import ChatOpenAI
+with timed_import("qnaagent"):
+    from qnaagent import ask_agent
+    from qnaagent import ask_agent, terminal_chat_with_agent
+from azurespeech import canceled_handler, handle_transcribed, mark_session_start, meeting_log
 import shared
-from vectorstore import create_docs, update_docs
-import whisperstt
-from openai import OpenAI
+with timed_import("vectorstore"):
+    from vectorstore import create_docs, update_docs, list_documents, backfill_digests
+    from embeddingcache import embedding_cache
 import asyncio
-from fastapi.responses import JSONResponse
+import json
+
+# 실시간 회의에서만 필요한 오디오 모듈(sounddevice, Azure Speech SDK, Whisper 등)은
+# resources.module()로 처음 사용할 때 import 합니다.
+AUDIO_MODULES = ["recordingaudio", "whisperstt"]
+# 기본 마이크에 바인딩되는 리소스는 실시간 회의를 시작할 때만 생성 (마이크 없는 서버에서 warm-up이 실패하지 않도록)
+MICROPHONE_RESOURCES = {"audio_config", "speech_recognizer", "conversation_transcriber"}
 
 app = FastAPI()
 SITE='https://lgucorp.atlassian.net'
@@ -27,8 +45,6 @@ markdown_converter = html2text.HTML2Text()
 CONFLUENCE_TOKEN = os.getenv("CONFLUENCE_TOKEN", "")
 CONFLUENCE_EMAIL = os.getenv("CONFLUENCE_EMAIL", "")
 CHATGPT_API_KEY = os.getenv("CHATGPT_API_KEY", "")
-http_client = httpx.Client(verify=False)
-client = OpenAI(api_key=CHATGPT_API_KEY, http_client=http_client)
 
 # 프론트 도메인(포트) 추가: 개발 중이면 보통 Next.js가 3000
 origins = [
@@ -46,6 +62,12 @@ app.add_middleware(
     allow_headers=["*"],         # Content-Type: application/json 등 허용
 )
 
+@app.middleware("http")
+async def llm_usage_endpoint_tag(request, call_next):
+    # 이 요청에서 일어나는 LLM 호출을 엔드포인트별로 집계
+    with llmusage.tag(endpoint=f"{request.method} {request.url.path}"):
+        return await call_next(request)
+
 
 class RagRequest(BaseModel):
     label: str
@@ -60,25 +82,23 @@ class RagChatRequest(BaseModel):
 
 
 
-# llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-llm = ChatOpenAI(model="gpt-4o-mini")
-# llm.invoke("안녕하세요!")
-
-# 오디오 캡처
+# 오디오 캡처 (stop_audio_capture()가 호출될 때까지 블로킹, 종료 시 audio_q에 센티널을 넣음)
 async def audio_capture_loop():
-    while not shared.stop_event.is_set():
-        await asyncio.to_thread(start_audio_capture)  # 블로킹이면 작은 단위로 처리
-        await asyncio.sleep(0.01)  # 루프 양보
+    recordingaudio = resources.module("recordingaudio")
+    await asyncio.to_thread(recordingaudio.start_audio_capture)
 
-# Whisper 처리
+# Whisper 처리 (audio_q 센티널을 받으면 남은 오디오를 처리하고 종료)
 async def whisper_loop():
-    while not shared.stop_event.is_set():
-        await asyncio.to_thread(whisperstt.process_audio)  # 블로킹이면 chunk 단위 처리
-        await asyncio.sleep(0.01)
+    whisperstt = resources.module("whisperstt")
+    await asyncio.to_thread(whisperstt.process_audio)
 
 async def main_loop():
+    conversation_transcriber = resources.module("recordingaudio").get_conversation_transcriber()
     conversation_transcriber.transcribed.connect(handle_transcribed)
     conversation_transcriber.canceled.connect(canceled_handler)
+    mark_session_start()
+    # 실시간 회의 중 병합/화자 확인 LLM 호출은 이 회의로 집계
+    llmusage.start_meeting(f"live-{time.strftime('%Y%m%d-%H%M%S')}")
     conversation_transcriber.start_transcribing_async()
     
     await asyncio.gather(
@@ -136,16 +156,19 @@ class QueryResponse(BaseModel):
 @app.post("/api/rag/upload", response_model=QueryResponse)
 async def upload_endpoint(req: RagRequest):
     label_title = req.label
-    pages = confluence.search_pages_by_label_in_space(label_title + '완료', 'UMEET')
-    create_docs(pages)
-    return QueryResponse(answer="업로드 완료")
+    pages, complete = await asyncio.to_thread(confluence.list_pages_by_label_in_space, label_title + '완료', 'UMEET')
+    # 버전이 바뀐 페이지만 다시 임베딩 (변경 없는 라벨은 임베딩 호출 없이 끝남)
+    stats = await create_docs(pages, label=label_title + '완료', complete=complete)
+    removed = "삭제 생략: 검색 결과 불완전" if stats["removal_skipped"] else f"삭제 {stats['removed']}"
+    return QueryResponse(answer=f"업로드 완료 (신규 {stats['new']}, 변경 {stats['changed']}, "
+                                f"변경 없음 {stats['unchanged']}, {removed})")
     
 
 @app.post("/api/rag/chat", response_model=QueryResponse)
-def ask_endpoint(req: RagChatRequest):
+async def ask_endpoint(req: RagChatRequest):
     if not req.question.strip():
         raise HTTPException(status_code=400, detail="Query is empty")
-    answer = ask_agent(req.question, "1")
+    answer = await ask_agent(req.question, "1")
     return QueryResponse(answer=answer)
 
 # API에서 루프 시작
@@ -154,6 +177,7 @@ async def start_endpoint():
     if shared.main_task is not None and not shared.main_task.done():
         return QueryResponse(answer="이미 실행 중입니다.")
     shared.stop_event.clear()
+    shared.capture_stop_event.clear()
     shared.main_task = asyncio.create_task(main_loop())
     return QueryResponse(answer="실시간 회의 시작")
 
@@ -162,18 +186,21 @@ async def stop_endpoint():
     if shared.main_task is None:
         return QueryResponse(answer="실행중인 작업이 없습니다.")
     shared.stop_event.set()
-    conversation_transcriber.stop_transcribing_async()
+    recordingaudio = resources.module("recordingaudio")
+    recordingaudio.stop_audio_capture()
+    recordingaudio.get_conversation_transcriber().stop_transcribing_async()
     return QueryResponse(answer="실시간 회의 종료 완료")
 
 @app.get("/api/note")
 async def get_endpoint():
-    return whisperstt.final_meeting_log
+    return resources.module("whisperstt").final_meeting_log
 
 @app.post("/api/stt")
 async def stt_endpoint(audiofile: UploadFile, azuretext: str = Form(...)):
     print(f"Uploaded file name: {audiofile.filename}")
     file_content = await audiofile.read() 
     
+    whisperstt = resources.module("whisperstt")
     log = await whisperstt.stt_with_whisper(file_content, azuretext)
     return QueryResponse(answer=log)
 
@@ -184,10 +211,106 @@ class UpdateRequest(BaseModel):
 @app.post("/api/note/summary")
 async def summary_endpoint(req: UpdateRequest):
     print(req.text)
-    summary = await summarize_meeting_log(req.text)
-    await update_docs(summary, req.title)
+    # 같은 회의록(공백 차이 무시)+제목이면 캐시된 요약을 반환하고 문서도 다시 넣지 않음
+    cache_key = summary_cache.key("summary", req.text, req.title, SUMMARY_PROMPT_VERSION)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        return QueryResponse(answer=cached)
+    with llmusage.tag(meeting=req.title):
+        summary = await summarize_meeting_log(req.text)
+    if summary is None:
+        raise HTTPException(status_code=502, detail="요약 생성에 실패했습니다.")
+    await update_docs(summary, req.title, digest=summary)
+    summary_cache.put(cache_key, summary)
+    return QueryResponse(answer=summary)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+_background_tasks = set()  # 클라이언트 연결이 끊겨도 문서 반영이 끝나도록 참조 유지
+
+async def _summary_events(cache_key, summarize, docs_text, title):
+    """
+    요약을 SSE 이벤트로 흘려보냅니다: progress(구간 요약 진행), token(최종 요약 조각), done(전체 텍스트), error
+    전체 텍스트는 done 이후 백그라운드에서 update_docs에 넣고 캐시에 저장합니다.
+    """
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        yield _sse("token", {"text": cached})
+        yield _sse("done", {"text": cached, "cached": True})
+        return
+
+    events = asyncio.Queue()
+
+    async def run():
+        try:
+            summary = await summarize(
+                lambda text: events.put_nowait(("token", {"text": text})),
+                lambda stage, done, total: events.put_nowait(("progress", {"stage": stage, "done": done, "total": total})),
+            )
+        except Exception as e:
+            summary = None
+            print(f"요약 스트리밍 실패: {e}")
+        if summary is None:
+            events.put_nowait(("error", {"detail": "요약 생성에 실패했습니다."}))
+            return
+        events.put_nowait(("done", {"text": summary, "cached": False}))
+        await update_docs(docs_text(summary), title, digest=summary)
+        summary_cache.put(cache_key, summary)
+
+    with llmusage.tag(meeting=title):
+        task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    while True:
+        event, data = await events.get()
+        yield _sse(event, data)
+        if event in ("done", "error"):
+            break
+
+@app.post("/api/note/summary/stream")
+async def summary_stream_endpoint(req: UpdateRequest):
+    cache_key = summary_cache.key("summary", req.text, req.title, SUMMARY_PROMPT_VERSION)
+    return StreamingResponse(_summary_events(
+        cache_key,
+        lambda on_token, on_progress: summarize_meeting_log(req.text, on_token, on_progress),
+        lambda summary: summary,
+        req.title,
+    ), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class LiveSummaryRequest(BaseModel):
+    title: str
+
+@app.post("/api/note/summary/live")
+async def live_summary_endpoint(req: LiveSummaryRequest):
+    # 실시간 회의록 요약: 회의 중에 만든 5분 구간 요약만 합침 (진행 중인 구간은 지금까지의 발화로 요약)
+    if not resources.is_loaded("module:whisperstt"):
+        raise HTTPException(status_code=404, detail="실시간 회의록이 없습니다.")
+    whisperstt = resources.module("whisperstt")
+    cache_key = summary_cache.key("summary", format_log(whisperstt.final_meeting_log), req.title, SUMMARY_PROMPT_VERSION)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        return QueryResponse(answer=cached)
+    windows = await asyncio.to_thread(whisperstt.window_summarizer.collect)
+    if not windows:
+        raise HTTPException(status_code=404, detail="요약할 발화가 없습니다.")
+    with llmusage.tag(meeting=req.title):
+        summary = await summarize_windows(windows)
+    if summary is None:
+        raise HTTPException(status_code=502, detail="요약 생성에 실패했습니다.")
+    await update_docs(summary, req.title, digest=summary)
+    summary_cache.put(cache_key, summary)
     return QueryResponse(answer=summary)
 
+@app.get("/api/note/windows")
+def windows_endpoint():
+    # 회의 중 닫힌 구간별 요약 (구간 시간, 발화 수, 요약)
+    if not resources.is_loaded("module:whisperstt"):
+        return {}
+    return resources.module("whisperstt").window_summarizer.report()
+
 
 class SaveConfluence(BaseModel):
     label: str
@@ -217,10 +340,29 @@ async def save_confluence_and_send_mail(req: SaveConfluence):
 @app.post("/api/note/summaryall")
 async def summaryall(req: UpdateRequest):
     print(req.text)
-    summary = await summarize_all(req.text, req.title)
-    await update_docs(req.text, req.title)
+    cache_key = summary_cache.key("summaryall", req.text, req.title, SUMMARY_PROMPT_VERSION)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        return QueryResponse(answer=cached)
+    with llmusage.tag(meeting=req.title):
+        summary = await summarize_all(req.text, req.title)
+    if summary is None:
+        raise HTTPException(status_code=502, detail="요약 생성에 실패했습니다.")
+    # 방금 만든 요약을 문서 digest로 사용 (원문을 다시 요약하지 않음)
+    await update_docs(req.text, req.title, digest=summary)
+    summary_cache.put(cache_key, summary)
     return QueryResponse(answer=summary)
 
+@app.post("/api/note/summaryall/stream")
+async def summaryall_stream_endpoint(req: UpdateRequest):
+    cache_key = summary_cache.key("summaryall", req.text, req.title, SUMMARY_PROMPT_VERSION)
+    return StreamingResponse(_summary_events(
+        cache_key,
+        lambda on_token, on_progress: summarize_all(req.text, req.title, on_token, on_progress),
+        lambda summary: req.text,
+        req.title,
+    ), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 @app.get("/api/comments/{labelName}")
 def get_comments_by_label(labelName:str):
@@ -246,3 +388,77 @@ def get_comments_by_label(labelName:str):
         data_list.append(data)
     return data_list
 
+
+
+class WarmupRequest(BaseModel):
+    # 비워두면 오디오 모듈을 포함해 등록된 리소스 전체(마이크 바인딩 리소스 제외)를 미리 생성 (예: ["qnaagent.agent"])
+    names: list[str] | None = None
+
+@app.post("/api/warmup")
+def warmup_endpoint(req: WarmupRequest):
+    # 리소스 하나가 실패해도 나머지는 생성하고, 실패한 리소스는 응답에 포함
+    errors = {}
+    elapsed = {}
+    names = req.names
+    if names is None:
+        # 오디오 모듈 import도 같은 방식으로 (PortAudio/Speech SDK가 없는 서버에서는 실패로만 보고)
+        modules = [resources.register_module(name) for name in AUDIO_MODULES + ["sttbackend"]]
+        elapsed.update(resources.warm_up(modules, errors=errors))
+        names = [n for n in resources.report()["registered"]
+                 if not n.startswith(("stt.", "module:")) and n not in MICROPHONE_RESOURCES]
+        # 전사 엔진은 설정된 것만 생성 (로컬 Whisper 모델은 필요할 때만 로드)
+        if resources.is_loaded("module:sttbackend"):
+            names.append(f"stt.{resources.module('sttbackend').STT_ENGINE}")
+    try:
+        elapsed.update(resources.warm_up(names, errors=errors))
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"warmed": elapsed, "failed": errors, "report": resources.report()}
+
+@app.get("/api/pipeline/stats")
+def pipeline_stats_endpoint():
+    # 실시간 회의를 시작하지 않았으면 오디오 모듈을 로드하지 않음
+    if not resources.is_loaded("module:whisperstt"):
+        return {}
+    return resources.module("whisperstt").pipeline_stats()
+
+@app.get("/api/note/summary/stats")
+def summary_stats_endpoint():
+    # 가장 최근 요약의 단계별(direct/map/collapse/reduce) 시간과 토큰
+    return summary_stats
+
+@app.get("/api/note/summary/cache")
+def summary_cache_endpoint():
+    # 요약 캐시 항목 수/크기와 종류별(summary, summaryall, section) hit rate
+    return summary_cache.stats()
+
+@app.get("/api/rag/documents")
+def documents_endpoint(offset: int = 0, limit: int = 50):
+    # 벡터 DB 문서 목록 (문서별 digest, 페이지 단위)
+    return list_documents(offset, min(max(limit, 1), 200))
+
+@app.post("/api/rag/digests/backfill")
+async def backfill_digests_endpoint():
+    # digest 도입 전에 넣은 문서의 digest 생성
+    return {"created": await backfill_digests()}
+
+@app.get("/api/rag/embeddings/cache")
+def embedding_cache_endpoint():
+    # 임베딩 캐시 항목 수/크기와 모델별 hit rate
+    return embedding_cache.stats()
+
+@app.get("/api/llm/stats")
+def llm_stats_endpoint():
+    # 공용 LLM 클라이언트의 요청 수, 진행 중, 재시도, 타임아웃, 실패
+    return llmclient.stats
+
+@app.get("/api/llm/usage")
+def llm_usage_endpoint(meeting: str | None = None):
+    # 호출 위치/엔드포인트/회의/모델별 토큰, 지연 시간, 비용 (회의를 지정하면 그 회의 합계만)
+    return llmusage.report(meeting)
+
+@app.get("/api/startup")
+def startup_report_endpoint():
+    return resources.report()
+
+resources.startup_report["imports"]["main"] = time.perf_counter() - _main_import_start
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import time
+
+# 긴 회의록 요약 설정 (토큰 기준)
+SUMMARY_DIRECT_TOKENS = int(os.getenv("SUMMARY_DIRECT_TOKENS", "6000"))  # 이하이면 한 번에 요약
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", "3000"))  # map 단계 구간 크기
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))  # 동시에 보내는 요약 요청 수
+SUMMARY_TOKEN_MODEL = os.getenv("SUMMARY_TOKEN_MODEL", "gpt-4o-mini")
+
+_encoding = None
+
+
+def count_tokens(text):
+    """tiktoken이 있으면 실제 토큰 수, 없으면 글자 수로 추정 (한국어는 대략 글자당 1토큰)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(SUMMARY_TOKEN_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text)
+
+
+def split_sections(text, max_tokens=SUMMARY_SECTION_TOKENS):
+    """줄(발화) 경계에서 max_tokens 이하의 구간으로 나눔. 한 줄이 너무 길면 그 줄만 글자 단위로 자름"""
+    sections = []
+    current, current_tokens = [], 0
+    for line in text.splitlines():
+        tokens = count_tokens(line) + 1
+        if tokens > max_tokens:
+            if current:
+                sections.append("\n".join(current))
+                current, current_tokens = [], 0
+            step = max(1, len(line) * max_tokens // tokens)
+            sections.extend(line[i:i + step] for i in range(0, len(line), step))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            sections.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+class StageStats:
+    """요약 단계별 호출 수, 벽시계 시간, 입력/출력 토큰"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.cached = 0  # 캐시로 대신한 호출 수
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.seconds = 0.0
+
+    def add(self, messages, resp):
+        self.calls += 1
+        usage = getattr(resp, "usage_metadata", None)
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+        else:
+            self.input_tokens += sum(count_tokens(m.content) for m in messages)
+            self.output_tokens += count_tokens(resp.content)
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "cached": self.cached,
+            "seconds": round(self.seconds, 3),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+async def map_reduce(text, llm, map_messages, reduce_messages, direct_messages,
+                     direct_tokens=SUMMARY_DIRECT_TOKENS, section_tokens=SUMMARY_SECTION_TOKENS,
+                     concurrency=SUMMARY_CONCURRENCY, cache=None, cache_version="",
+                     on_token=None, on_progress=None, site="summary"):
+    """
+    긴 텍스트를 map-reduce로 요약합니다. llm은 achat(messages)/astream(messages)를 제공하는 객체(llmclient)입니다.
+
+    - direct_tokens 이하: direct_messages(text) 한 번으로 요약 (기존 방식)
+    - 그 외: 구간별 map_messages(section, index, total)를 concurrency개씩 동시에 요약하고,
+      구간 요약들을 reduce_messages(partials)로 합칩니다. 구간 요약의 합이 section_tokens를 넘으면
+      묶음별로 다시 map 프롬프트로 줄이는 단계를 반복합니다.
+    - cache(SummaryCache)가 있으면 map 단계 구간 요약을 프롬프트 해시로 재사용합니다. 회의록 뒤쪽만
+      늘어난 경우 앞 구간은 다시 요약하지 않습니다.
+    - on_token(text)이 있으면 마지막 단계(direct/reduce)를 스트리밍으로 받아 조각마다 호출합니다.
+    - on_progress(stage, done, total)는 map/collapse 단계에서 구간 요약이 끝날 때마다 호출됩니다.
+    - LLM 사용량은 "{site}.{단계}" 호출 위치로 집계됩니다.
+    반환: (요약 텍스트, 단계별 통계 dict)
+    """
+    stages = []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def call(stage, messages, cacheable, stream):
+        key = None
+        if cacheable and cache is not None:
+            key = cache.key("section", "\n".join(m.content for m in messages), version=cache_version)
+            cached = cache.get(key)
+            if cached is not None:
+                stage.cached += 1
+                return cached
+        async with semaphore:
+            if stream:
+                resp = None
+                async for chunk in llm.astream(messages, site=f"{site}.{stage.name}"):
+                    if chunk.content:
+                        on_token(chunk.content)
+                    resp = chunk if resp is None else resp + chunk
+            else:
+                resp = await llm.achat(messages, site=f"{site}.{stage.name}")
+        stage.add(messages, resp)
+        result = resp.content.strip()
+        if key is not None:
+            cache.put(key, result)
+        return result
+
+    async def run_stage(name, message_lists, cacheable=False, stream=False):
+        stage = StageStats(name)
+        stages.append(stage)
+        t0 = time.perf_counter()
+        done = 0
+
+        async def tracked(messages):
+            nonlocal done
+            result = await call(stage, messages, cacheable, stream)
+            done += 1
+            if on_progress is not None and not stream:
+                on_progress(name, done, len(message_lists))
+            return result
+
+        results = await asyncio.gather(*(tracked(messages) for messages in message_lists))
+        stage.seconds = time.perf_counter() - t0
+        return results
+
+    total_tokens = count_tokens(text)
+    if total_tokens <= direct_tokens:
+        result = (await run_stage("direct", [direct_messages(text)], stream=on_token is not None))[0]
+    else:
+        sections = split_sections(text, section_tokens)
+        partials = await run_stage("map", [map_messages(s, i + 1, len(sections)) for i, s in enumerate(sections)], True)
+        level = 1
+        # 구간 요약이 아직 한 번에 넣기에 크면 묶어서 한 단계 더 줄임
+        while len(partials) > 1 and count_tokens("\n\n".join(partials)) > section_tokens:
+            groups = split_sections("\n\n".join(partials), section_tokens)
+            if len(groups) >= len(partials):
+                break
+            level += 1
+            partials = await run_stage(f"collapse{level}", [map_messages(g, i + 1, len(groups)) for i, g in enumerate(groups)])
+        result = (await run_stage("reduce", [reduce_messages(partials)], stream=on_token is not None))[0]
+
+    stats = {
+        "transcript_tokens": total_tokens,
+        "stages": {stage.name: stage.to_dict() for stage in stages},
+        "seconds": round(sum(stage.seconds for stage in stages), 3),
+    }
+    print(f"요약 통계: {stats}")
+    return result, stats
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.ndimage import uniform_filter
+
+# 노이즈 억제 설정
+NOISE_N_STD = float(os.getenv("NOISE_N_STD", "1.5"))  # 노이즈 평균 + n_std * 표준편차 이상만 음성으로 통과
+NOISE_PROP_DECREASE = float(os.getenv("NOISE_PROP_DECREASE", "0.8"))
+NOISE_PROFILE_ALPHA = float(os.getenv("NOISE_PROFILE_ALPHA", "0.1"))  # 노이즈 프로파일 갱신 비율
+NOISE_MIN_PROFILE_FRAMES = int(os.getenv("NOISE_MIN_PROFILE_FRAMES", "8"))
+
+
+class NoiseSuppressor:
+    """
+    묵음 프레임으로 학습한 노이즈 프로파일을 계속 갱신하면서, 세그먼트마다 stationary spectral gating을 적용합니다.
+
+    - update_profile(): VAD가 묵음으로 판단한 오디오를 넣으면 주파수별 노이즈 평균/편차를 EMA로 갱신
+    - reduce(): 프로파일 기준 임계값으로 마스크를 만들어 STFT -> 게이팅 -> ISTFT
+    FFT 크기와 창(window)을 고정해 두어 scipy.fft의 plan 캐시를 세그먼트마다 재사용합니다.
+    """
+
+    def __init__(self, sample_rate, n_fft=None, prop_decrease=NOISE_PROP_DECREASE, n_std=NOISE_N_STD,
+                 alpha=NOISE_PROFILE_ALPHA, min_profile_frames=NOISE_MIN_PROFILE_FRAMES):
+        self.sample_rate = sample_rate
+        # 약 46ms 창 (44100Hz -> 2048, 16000Hz -> 1024)
+        self.n_fft = n_fft or int(2 ** np.ceil(np.log2(sample_rate * 0.046)))
+        self.hop = self.n_fft // 2
+        self.prop_decrease = prop_decrease
+        self.n_std = n_std
+        self.alpha = alpha
+        self.min_profile_frames = min_profile_frames
+        # 50% overlap에서 합이 1이 되는 periodic hann 창 -> 게인 1이면 원본 그대로 복원
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.n_fft) / self.n_fft)).astype(np.float32)
+
+        self._noise_mean_db = None
+        self._noise_std_db = None
+        self.profile_frames = 0
+        self._pending = []  # 아직 FFT 한 프레임이 안 되는 묵음 샘플
+        self._pending_len = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.profile_frames >= self.min_profile_frames
+
+    def _stft(self, audio):
+        n = len(audio)
+        pad_end = self.hop
+        rem = (n + 2 * self.hop - self.n_fft) % self.hop
+        if rem:
+            pad_end += self.hop - rem
+        padded = np.pad(audio.astype(np.float32, copy=False), (self.hop, pad_end))
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[::self.hop]
+        return sp_fft.rfft(frames * self.window, axis=1), len(padded)
+
+    def _istft(self, spec, padded_len, n):
+        frames = sp_fft.irfft(spec, n=self.n_fft, axis=1).astype(np.float32)
+        # hop == n_fft / 2 이므로 앞/뒤 절반을 한 칸씩 밀어 더하면 overlap-add
+        out = np.zeros((len(frames) + 1, self.hop), dtype=np.float32)
+        out[:-1] += frames[:, :self.hop]
+        out[1:] += frames[:, self.hop:]
+        return out.reshape(-1)[self.hop:self.hop + n]
+
+    def update_profile(self, silent_audio):
+        """VAD가 묵음으로 판단한 오디오로 노이즈 프로파일 갱신"""
+        self._pending.append(np.array(silent_audio, dtype=np.float32).reshape(-1))
+        self._pending_len += len(self._pending[-1])
+        if self._pending_len < self.n_fft * 4:
+            return
+        audio = np.concatenate(self._pending)
+        self._pending = []
+        self._pending_len = 0
+
+        spec, _ = self._stft(audio)
+        mag_db = 20 * np.log10(np.abs(spec[1:-1]) + 1e-10)  # 패딩이 걸친 양 끝 프레임 제외
+        if len(mag_db) == 0:
+            return
+        mean_db = mag_db.mean(axis=0)
+        std_db = mag_db.std(axis=0)
+        with self._lock:
+            if self._noise_mean_db is None:
+                self._noise_mean_db, self._noise_std_db = mean_db, std_db
+            else:
+                self._noise_mean_db = (1 - self.alpha) * self._noise_mean_db + self.alpha * mean_db
+                self._noise_std_db = (1 - self.alpha) * self._noise_std_db + self.alpha * std_db
+            self.profile_frames += len(mag_db)
+
+    def reduce(self, audio):
+        """현재 노이즈 프로파일로 stationary spectral gating 적용"""
+        with self._lock:
+            if self._noise_mean_db is None:
+                raise RuntimeError("노이즈 프로파일이 아직 없습니다.")
+            threshold_db = self._noise_mean_db + self.n_std * self._noise_std_db
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        spec, padded_len = self._stft(audio)
+        mag_db = 20 * np.log10(np.abs(spec) + 1e-10)
+        mask = (mag_db > threshold_db).astype(np.float32)
+        # 시간(프레임) 3개, 주파수 5개 bin으로 마스크를 부드럽게 해서 뮤지컬 노이즈 완화
+        mask = uniform_filter(mask, size=(3, 5), mode="nearest")
+        gain = mask + (1 - mask) * (1 - self.prop_decrease)
+        return self._istft(spec * gain, padded_len, len(audio))
+
+
+def _bench(sample_rate=44100, seconds=30, repeat=3):
+    """세그먼트 처리의 오디오 1초당 CPU 시간: 프로파일 기반 gating vs noisereduce non-stationary"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    noise = rng.normal(0, 0.02, t.size).astype(np.float32)
+    speech = (0.2 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.3 * t) > 0)).astype(np.float32)
+    audio = speech + noise
+
+    suppressor = NoiseSuppressor(sample_rate)
+    suppressor.update_profile(rng.normal(0, 0.02, sample_rate * 2).astype(np.float32))
+
+    def cpu_per_second(func):
+        t0 = time.process_time()
+        for _ in range(repeat):
+            func()
+        return (time.process_time() - t0) / repeat / seconds
+
+    gating = cpu_per_second(lambda: suppressor.reduce(audio))
+    print(f"프로파일 기반 gating: 오디오 1초당 CPU {gating * 1000:.2f}ms")
+    try:
+        import noisereduce as nr
+    except ImportError:
+        print("noisereduce가 설치되어 있지 않아 비교를 건너뜁니다.")
+        return
+    baseline = cpu_per_second(lambda: nr.reduce_noise(y=audio, sr=sample_rate, stationary=False, prop_decrease=0.8))
+    print(f"noisereduce non-stationary: 오디오 1초당 CPU {baseline * 1000:.2f}ms ({baseline / gating:.1f}x)")
+
+
+if __name__ == "__main__":
+    _bench()
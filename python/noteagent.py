@@ -1,21 +1,63 @@
 import json
-from azurespeech import meeting_log
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
+import os
+import threading
+import time
+from azurespeech import meeting_log, speaker_registry
+from speakerregistry import SpeakerRegistry
+from langchain_core.messages import SystemMessage, HumanMessage
+import llmclient
+from aligner import align, to_log_entries, uncovered_spans
+from jsonstream import JsonArrayStream
+from mapreduce import map_reduce
+from summarycache import summary_cache
+from windowsummary import format_offset
 
 meeting_log_whisper = []
 
-
-llm = ChatOpenAI(model="gpt-4o-mini")
-
-# LLM에 전달할 때는 status 필드 제거
-def get_ready_for_llm():
-    clean_log = []
-    for entry in meeting_log:
-        if entry.get('_status') != 'done':  # 완료되지 않은 발화만 선택
-            clean_entry = {k: v for k, v in entry.items() if k != '_status'}
-            clean_log.append(clean_entry)
-    return clean_log
+# Whisper 세그먼트와 겹치는 Azure 발화만 병합 프롬프트에 넣기 위한 설정
+MERGE_WINDOW_MARGIN = float(os.getenv("MERGE_WINDOW_MARGIN", "2.0"))  # 세그먼트 앞뒤 여유 (초)
+MERGE_STALE_SECONDS = float(os.getenv("MERGE_STALE_SECONDS", "60"))  # 이보다 오래 매칭되지 않은 발화는 완료 처리
+MERGE_MAX_AZURE_ENTRIES = int(os.getenv("MERGE_MAX_AZURE_ENTRIES", "20"))  # 한 번에 보내는 최대 발화 수
+MERGE_MODE = os.getenv("MERGE_MODE", "align")  # align: 로컬 정렬 + 저신뢰 구간만 LLM, llm: 전부 LLM
+_merge_cursor = 0  # meeting_log에서 아직 완료되지 않은 첫 발화 위치
+_merge_lock = threading.Lock()
+
+def _clean_entry(entry):
+    # LLM에 전달할 때는 _status, _start 같은 내부 필드와 시각(start/end/time) 제거
+    return {k: v for k, v in entry.items() if not k.startswith('_') and k not in ('start', 'end', 'time')}
+
+def get_ready_for_llm(start=None, end=None):
+    """
+    병합할 Azure 발화를 반환합니다.
+    start/end(세그먼트 캡처 시각)가 있으면 그 구간과 겹치는 발화만 고르고, 구간 안에서 끝난 발화는
+    완료 처리해서 커서를 전진시킵니다. 시각 정보가 없으면 완료되지 않은 최근 발화만 보냅니다.
+    """
+    global _merge_cursor
+    with _merge_lock:
+        window = []
+        for entry in meeting_log[_merge_cursor:]:
+            if entry.get('_status') == 'done':  # 완료되지 않은 발화만 선택
+                continue
+            if start is None or entry.get('_start') is None:
+                window.append(entry)
+                continue
+            if entry['_end'] < start - MERGE_WINDOW_MARGIN:
+                # 다른 worker의 이전 구간일 수 있으므로 충분히 오래된 것만 완료 처리
+                if entry['_end'] < start - MERGE_STALE_SECONDS:
+                    entry['_status'] = 'done'
+                continue
+            if entry['_start'] > end + MERGE_WINDOW_MARGIN:
+                break  # meeting_log는 시간순
+            window.append(entry)
+        window = window[-MERGE_MAX_AZURE_ENTRIES:]
+
+        for entry in window:
+            # 다음 세그먼트까지 이어지는 발화는 다음 구간에서도 쓰도록 남겨 둠
+            if start is None or entry.get('_end') is None or entry['_end'] <= end + MERGE_WINDOW_MARGIN:
+                entry['_status'] = 'done'
+        while _merge_cursor < len(meeting_log) and meeting_log[_merge_cursor].get('_status') == 'done':
+            _merge_cursor += 1
+        return [_clean_entry(entry) for entry in window]
 
 def get_log_for_llm(log):
     clean_log = []
@@ -26,141 +68,269 @@ def get_log_for_llm(log):
             clean_log.append(clean_entry)
     return clean_log
 
-# Agent가 사용할 함수: Whisper로 Azure 로그 덮어쓰기
-def overwrite_azure_with_whisper(whisper_text):
+# LLM 응답 스키마: 발화 배열을 structured output(json_schema)으로 강제
+UTTERANCE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "meeting_log",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "utterances": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "speaker": {"type": "string"},
+                            "text": {"type": "string"},
+                            "source": {"type": "string", "enum": ["Whisper", "Azure"]},
+                        },
+                        "required": ["speaker", "text", "source"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["utterances"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _to_entry(item):
+    # 스키마를 벗어난 원소는 버림
+    if not isinstance(item, dict) or not isinstance(item.get("speaker"), str) or not isinstance(item.get("text"), str):
+        return None
+    return {"speaker": item["speaker"], "text": item["text"], "source": item.get("source") or "Whisper"}
+
+
+def _stream_utterances(messages, on_entry=None, site=None, raise_errors=False):
+    """
+    structured output으로 발화 배열을 스트리밍 받아, 발화가 완성될 때마다 on_entry(entry)를 호출합니다.
+    응답이 중간에 끊기거나 실패해도 그때까지 받은 발화 리스트를 반환합니다 (None을 반환하지 않음).
+    raise_errors면 실패를 다시 올려서, 호출한 쪽이 받지 못한 나머지를 처리할 수 있게 합니다.
+    """
+    parser = JsonArrayStream()
+    entries = []
+    t0 = time.perf_counter()
+    first = None
+    try:
+        for chunk in llmclient.stream(messages, site=site, response_format=UTTERANCE_FORMAT):
+            for item in parser.feed(chunk.content):
+                entry = _to_entry(item)
+                if entry is None:
+                    continue
+                if first is None:
+                    first = time.perf_counter() - t0
+                entries.append(entry)
+                if on_entry is not None:
+                    on_entry(entry)
+    except Exception as e:
+        print(f"Agent 응답 스트리밍 실패: {e} ({len(entries)}개 발화 수신)")
+        if raise_errors:
+            raise
+    if parser.errors:
+        print(f"Agent 응답 파싱 실패 원소: {parser.errors}개")
+    if first is not None:
+        print(f"Agent 응답: 첫 발화 {first:.2f}초, 전체 {time.perf_counter() - t0:.2f}초, {len(entries)}개 발화")
+    return entries
+
+
+def llm_merge(whisper_text, azure_entries, on_entry=None, raise_errors=False):
+    """LLM으로 Whisper 텍스트를 Azure 발화에 맞춰 화자별 발화로 병합 (발화마다 on_entry 호출)"""
     # LangChain에게 "이 Whisper 텍스트를 Azure 로그에 맞춰 덮어쓰기" 요청
     messages = [
         SystemMessage(content="회의록을 Whisper 텍스트로 업데이트하는 Agent입니다."),
         HumanMessage(content=f"""
 아래는 현재 Azure 회의록입니다:
-{get_ready_for_llm()}
+{azure_entries}
 
 아래는 Whisper에서 인식된 전체 텍스트입니다:
 {whisper_text}
 
-각 발화를 다음 규칙으로 JSON 배열에 넣어주세요:
+각 발화를 다음 규칙으로 utterances 배열에 넣어주세요:
 
 1. Whisper STT 발화를 **무조건 우선**으로 적용합니다.
 2. 만약 Whisper STT가 명백히 잘못 인식되었거나 무의미한 텍스트라면,
-   해당 구간은 Azure STT 발화를 대신 사용합니다.
-3. 반드시 JSON 배열 표준 형식으로만 반환:
-[
-    {{"speaker": "화자 이름", "text": "발화 내용", "source": "Whisper"}}
-]
-4. 모든 속성 이름과 문자열 값은 double quotes(\")로 감싸야 합니다.
-5. 반환 외에 다른 텍스트, 마크다운, 설명은 절대 포함하지 마세요.
+   해당 구간은 Azure STT 발화를 대신 사용하고 source를 "Azure"로 표시합니다.
+3. 발화 순서는 실제 말한 순서를 유지합니다.
 """)
     ]
-    resp = llm(messages)
-    # resp는 문자열로 올텐데, eval() 혹은 json.loads()로 리스트 형태로 변환 가능
+
+    def on_done(entry):
+        entry['status'] = 'done'
+        if on_entry is not None:
+            on_entry(entry)
+
+    return _stream_utterances(messages, on_done, site="noteagent.merge", raise_errors=raise_errors)
+
+
+def _merge_or_align(whisper_text, azure_entries, spans, emit):
+    """
+    LLM 병합 결과를 반환하고, LLM이 실패하면 spans(로컬 정렬 결과)를 대신 사용합니다.
+    응답이 중간에 끊기면 이미 넘긴 발화는 두고, 그 발화들이 덮지 못한 나머지 구간만 로컬 정렬 결과로 채웁니다.
+    """
+    received = []
+
+    def on_merged(entry):
+        received.append(entry)
+        emit(entry)
+
     try:
-        # print(resp)
-        resp_text = resp.content.strip()
-        # 싱글 쿼트를 더블 쿼트로 변환 (단순 replace는 안전하지 않을 수 있음)
-        resp_text = resp_text.replace("'", '"')
-        updated_log = json.loads(resp.content)  # 안전하게 처리 가능하면 json.loads 권장
-        # 각 발화에 status 추가
-        for entry in updated_log:
+        merged = llm_merge(whisper_text, azure_entries, on_merged, raise_errors=True)
+        rest = [] if merged else spans
+    except Exception:
+        merged = received
+        rest = uncovered_spans(spans, " ".join(entry["text"] for entry in received))
+    fallback = [dict(entry, status='done') for entry in to_log_entries(rest)]
+    for entry in fallback:
+        emit(entry)
+    return merged + fallback
+
+
+def merge_whisper_with_azure(whisper_text, azure_entries, on_entry=None):
+    """
+    Whisper 텍스트를 Azure 발화에 병합합니다.
+    MERGE_MODE=align이면 로컬 음절 정렬로 화자를 정하고, 정렬 신뢰도가 낮은 연속 구간만 LLM에 보냅니다.
+    on_entry가 있으면 병합된 발화를 순서대로 하나씩 바로 넘깁니다.
+    """
+    emit = on_entry if on_entry is not None else (lambda entry: None)
+    spans = align(whisper_text, azure_entries)
+    if MERGE_MODE == "llm":
+        return _merge_or_align(whisper_text, azure_entries, spans, emit)
+
+    merged = []
+    low_run = []  # 연속된 저신뢰 구간은 한 번에 LLM 병합
+
+    def flush_low_run():
+        indexes = sorted({i for span in low_run for i in span["azure"]})
+        merged.extend(_merge_or_align(" ".join(span["text"] for span in low_run),
+                                      [azure_entries[i] for i in indexes], low_run, emit))
+        low_run.clear()
+
+    for span in spans:
+        if span["low_confidence"] and span["azure"]:
+            low_run.append(span)
+            continue
+        if low_run:
+            flush_low_run()
+        for entry in to_log_entries([span]):
             entry['status'] = 'done'
-        print(updated_log)
-        # meeting_log_whisper.extend(updated_log)
-        # print(meeting_log_whisper)
-        return updated_log
-    except Exception as e:
-        print(f"Agent 로그 덮어쓰기 실패: {e}")
+            merged.append(entry)
+            emit(entry)
+    if low_run:
+        flush_low_run()
+    return merged
 
 
-def setting_name_in_meeting_log(log):
+# Agent가 사용할 함수: Whisper로 Azure 로그 덮어쓰기
+def overwrite_azure_with_whisper(whisper_text, start=None, end=None, on_entry=None):
+    # 세그먼트 구간(start~end)과 겹치는 Azure 발화만 사용
+    azure_window = get_ready_for_llm(start, end)
+    print(f"병합 대상 Azure 발화: {len(azure_window)}개")
+
+    def on_merged(entry):
+        # 화자 레지스트리에 등록된 이름을 바로 적용
+        speaker_registry.label_entry(entry)
+        if on_entry is not None:
+            on_entry(entry)
+
+    updated_log = merge_whisper_with_azure(whisper_text, azure_window, on_merged)
+    print(updated_log)
+    return updated_log
+
+
+NAME_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "speaker_name",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}},
+            "required": ["name"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def resolve_speaker_name(text):
+    """새 화자의 발화 하나만 보고 자기소개한 이름을 확인 (없으면 None)"""
     messages = [
-        SystemMessage(content="회의록을 Whisper 텍스트로 업데이트하는 Agent입니다."),
-        HumanMessage(content="아래는 현재 Whisper가 생성한 회의록 JSON 배열입니다:\n"
-    + json.dumps(log, ensure_ascii=False)
-    + """
-
-이 회의록에서 "speaker" 필드를 다음 규칙에 따라 업데이트하세요:
-
-규칙:
-1. 동일한 사람이 여러 발화를 했으면 같은 이름(또는 같은 화자명)으로 통일합니다.
-2. 발화 내용 속에서 자기소개(예: "저는 김아영입니다.", "안녕하세요, 이주혜입니다.")가 있으면,
-   해당 **발화를 한 화자에게만** 그 이름을 지정합니다.
-3. 자기소개가 없는 화자는 기존 화자 번호("화자 A", "화자 B" 등)를 유지합니다.
-   단, 동일 화자가 여러 차례 발화하면 같은 번호로 유지합니다.
-4. 이름이 확인되지 않지만 동일 화자가 반복 발화하는 경우 "화자 A", "화자 B", ... 와 같이 번호를 붙여 일관성 있게 유지합니다.
-5. 잘못 인식된 이름(예: '김아', '김아란')은 가장 올바른 이름으로 정정합니다. (예: 모두 '김아영')
-6. 자기소개로 이름이 지정된 화자와 다른 화자가 혼동되지 않도록 주의하세요.
-7. 반드시 표준 JSON 배열만 반환하며, 추가 설명이나 마크다운은 포함하지 마세요.
-
-출력 형식 예시:
-[
-  {"speaker": "김아영", "text": "저는 김아영입니다.", "source": "Whisper"},
-  {"speaker": "김아영", "text": "회의를 시작하겠습니다.", "source": "Whisper"},
-  {"speaker": "이주혜", "text": "안녕하세요, 이주혜입니다.", "source": "Whisper"}
-]
+        SystemMessage(content="회의 발화에서 화자가 자기소개한 이름을 찾는 Agent입니다."),
+        HumanMessage(content=f"""
+아래 발화에서 말하는 사람이 자기 이름을 소개했다면 그 이름만 name에 넣고, 아니면 빈 문자열을 넣으세요.
+잘못 인식된 이름(예: '김아', '김아란')은 가장 올바른 이름으로 정정합니다.
+직함, 역할, 다른 사람의 이름은 넣지 않습니다.
+
+발화: {text}
 """)
     ]
-    resp = llm(messages)
+    resp = llmclient.chat(messages, site="noteagent.speaker_name", response_format=NAME_FORMAT)
+    name = json.loads(resp.content).get("name", "").strip()
+    return name or None
 
-    try:
-        # print(resp)
-        resp_text = resp.content.strip()
-        # 싱글 쿼트를 더블 쿼트로 변환 (단순 replace는 안전하지 않을 수 있음)
-        resp_text = resp_text.replace("'", '"')
-        updated_log = json.loads(resp.content)  # 안전하게 처리 가능하면 json.loads 권장
-        return updated_log
-    except Exception as e:
-        print(f"Agent 로그 덮어쓰기 실패: {e}")
+
+speaker_registry.resolver = resolve_speaker_name
+
+
+def setting_name_in_meeting_log(log, registry=speaker_registry):
+    """
+    화자 레지스트리로 "화자 X"를 등록된 이름으로 바꾼 회의록을 반환합니다.
+    자기소개 감지는 발화마다 증분으로 하고, LLM은 이름이 없는 새 화자의 자기소개 후보에만 호출합니다.
+    이름이 나중에 등록된 화자의 앞선 발화도 여기서 함께 바뀝니다.
+    registry 기본값은 실시간 회의용 전역 레지스트리 (업로드 파일은 new_speaker_registry()로 따로)
+    """
+    for entry in log:
+        registry.label_entry(entry)
+    return registry.relabel(log)
+
+
+def new_speaker_registry():
+    """요청 하나(업로드 파일)만의 화자 레지스트리 (실시간 회의 매핑/파일과 섞이지 않음)"""
+    return SpeakerRegistry(label_map={}, path=None, resolver=resolve_speaker_name)
 
 
 # Agent가 사용할 함수: Whisper로 Azure 로그 덮어쓰기
 def overwrite_azure_with_whisper_stt(whisper_text, azure_log):
-    # LangChain에게 "이 Whisper 텍스트를 Azure 로그에 맞춰 덮어쓰기" 요청
-    messages = [
-        SystemMessage(content="회의록을 Whisper 텍스트로 업데이트하는 Agent입니다."),
-        HumanMessage(content=f"""
-아래는 현재 Azure 회의록입니다:
-{get_log_for_llm(azure_log)}
+    updated_log = merge_whisper_with_azure(whisper_text, get_log_for_llm(azure_log))
+    print(updated_log)
+    return updated_log
 
-아래는 Whisper에서 인식된 전체 텍스트입니다:
-{whisper_text}
 
-각 발화를 다음 규칙으로 JSON 배열에 넣어주세요:
+# 요약 단계별 시간/토큰 통계 (가장 최근 요약 기준)
+summary_stats = {}
+# 요약 프롬프트를 바꾸면 올려서 이전 캐시를 쓰지 않도록 함
+SUMMARY_PROMPT_VERSION = "2"
 
-1. Whisper STT 발화를 **무조건 우선**으로 적용합니다.
-2. 만약 Whisper STT가 명백히 잘못 인식되었거나 무의미한 텍스트라면,
-   해당 구간은 Azure STT 발화를 대신 사용합니다.
-3. 반드시 JSON 배열 표준 형식으로만 반환:
-[
-    {{"speaker": "화자 이름", "text": "발화 내용", "source": "Whisper"}}
-]
-4. 모든 속성 이름과 문자열 값은 double quotes(\")로 감싸야 합니다.
-5. 반환 외에 다른 텍스트, 마크다운, 설명은 절대 포함하지 마세요.
-""")
-    ]
-    resp = llm(messages)
-    # resp는 문자열로 올텐데, eval() 혹은 json.loads()로 리스트 형태로 변환 가능
-    try:
-        # print(resp)
-        resp_text = resp.content.strip()
-        # 싱글 쿼트를 더블 쿼트로 변환 (단순 replace는 안전하지 않을 수 있음)
-        resp_text = resp_text.replace("'", '"')
-        updated_log = json.loads(resp.content)  # 안전하게 처리 가능하면 json.loads 권장
-        # 각 발화에 status 추가
-        for entry in updated_log:
-            entry['status'] = 'done'
-        print(updated_log)
-        # meeting_log_whisper.extend(updated_log)
-        # print(meeting_log_whisper)
-        return updated_log
-    except Exception as e:
-        print(f"Agent 로그 덮어쓰기 실패: {e}")
+def _section_messages(kind):
+    """map 단계: 회의록 구간 하나를 다음 단계에서 합칠 수 있게 요약"""
+    def build(section, index, total):
+        # 구간 요약을 캐시로 재사용할 수 있도록 전체 구간 수(total)는 프롬프트에 넣지 않음
+        return [SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 긴 회의록을 나눈 구간 중 {index}번째 구간입니다.
+각 발언에는 시간과 발언자가 포함되어 있습니다. 이 구간을 나중에 다른 구간 요약과 합쳐 {kind}을 만들 수 있도록 요약하세요.
+
+[회의록 구간 {index}]
+---
+{section}
+---
 
+요청사항:
+- 논의된 주제별로 핵심 내용을 발언자와 함께 한두 문장으로 정리합니다.
+- 결정 사항과 조치사항(담당자, 기한)은 빠짐없이 남깁니다.
+- 시간 정보가 있으면 구간의 시작~끝 시간을 함께 적습니다.
+- 중복과 잡담은 제거합니다.""")]
+    return build
 
-async def summarize_meeting_log(text):
-    messages = [
-        SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 회의록의 원문 로그입니다. 
+
+def _meeting_log_messages(text, source="[회의록 원문]"):
+    return [
+        SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 회의록의 {'원문 로그' if source == '[회의록 원문]' else '구간별 요약'}입니다. 
 각 발언에는 시간과 발언자가 포함되어 있습니다. 
 
-[회의록 원문]
+{source}
 ---
 {text}
 ---
@@ -183,22 +353,11 @@ async def summarize_meeting_log(text):
 00:00~05:00: 요약 내용
 05:00~10:00: 요약 내용
 ...""")]
-    resp = await llm.apredict_messages(messages)
-    # resp는 문자열로 올텐데, eval() 혹은 json.loads()로 리스트 형태로 변환 가능
-    try:
-        # print(resp)
-        resp_text = resp.content.strip()
-        print(resp_text)
-        # meeting_log_whisper.extend(updated_log)
-        # print(meeting_log_whisper)
-        return resp_text
-    except Exception as e:
-        print(f"Agent 요약 실패: {e}")
 
 
-async def summarize_all(text, title):
-    messages = [
-        SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 회의록의 원문 로그입니다. 
+def _summary_all_messages(text, title, source="[회의록 원문]"):
+    return [
+        SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 회의록의 {'원문 로그' if source == '[회의록 원문]' else '구간별 요약'}입니다. 
 각 발언에는 시간과 발언자가 포함되어 있습니다. 
 제목에는 적절한 이모지를 사용하고, 가독성 있게 보일 수 있도록 작성하세요.
 
@@ -206,7 +365,7 @@ async def summarize_all(text, title):
 
 {title}
 
-[회의록 원문]
+{source}
 
 {text}
 ---
@@ -238,11 +397,80 @@ async def summarize_all(text, title):
 - 담당자: 작업 내용 (기한)
 """)]
 
-    resp = await llm.apredict_messages(messages)
+
+def _join_partials(partials):
+    return "\n\n".join(f"[구간 {i + 1}/{len(partials)}]\n{p}" for i, p in enumerate(partials))
+
+
+async def summarize_meeting_log(text, on_token=None, on_progress=None):
+    # 긴 회의록은 구간별로 동시에 요약한 뒤 합침 (짧으면 기존처럼 한 번에 요약)
+    # on_token이 있으면 최종 요약을 생성되는 대로 조각 단위로 넘김 (SSE 스트리밍용)
     try:
-        # print(resp)
-        resp_text = resp.content.strip()
+        resp_text, summary_stats["meeting_log"] = await map_reduce(
+            text, llmclient,
+            map_messages=_section_messages("문단별 요약과 5분 단위 시간별 요약"),
+            reduce_messages=lambda partials: _meeting_log_messages(_join_partials(partials), "[구간별 요약]"),
+            direct_messages=_meeting_log_messages,
+            cache=summary_cache, cache_version=SUMMARY_PROMPT_VERSION,
+            on_token=on_token, on_progress=on_progress, site="noteagent.summary",
+        )
         print(resp_text)
         return resp_text
     except Exception as e:
-        print(f"Agent 요약 실패: {e}")
\ No newline at end of file
+        print(f"Agent 요약 실패: {e}")
+
+
+def summarize_window(text, start, end):
+    """회의 중 닫힌 구간 하나("[MM:SS] 화자: 발화" 줄)를 요약 (windowsummary 백그라운드 스레드에서 호출)"""
+    label = f"{format_offset(start)}~{format_offset(end)}"
+    messages = [SystemMessage(content=f"""당신은 전문 회의록 요약가입니다. 아래는 진행 중인 회의의 {label} 구간 회의록입니다.
+각 발언 앞에는 회의 시작 기준 시각(분:초)과 발언자가 있습니다. 이 구간 요약들을 나중에 합쳐 회의록 요약을 만들 수 있도록 요약하세요.
+
+[회의록 구간 {label}]
+---
+{text}
+---
+
+요청사항:
+- 논의된 주제별로 핵심 내용을 발언자와 함께 한두 문장으로 정리합니다.
+- 결정 사항과 조치사항(담당자, 기한)은 빠짐없이 남깁니다.
+- 중복과 잡담은 제거합니다.""")]
+    resp = llmclient.chat(messages, site="noteagent.window_summary")
+    return resp.content.strip()
+
+
+def _join_windows(windows):
+    return "\n\n".join(f"[{w['label']}]\n{w['summary']}" for w in windows)
+
+
+async def summarize_windows(windows, on_token=None, on_progress=None):
+    """회의 중에 만든 구간 요약만 합쳐서 회의록 요약 (원문은 다시 보내지 않음)"""
+    try:
+        resp_text, summary_stats["windows"] = await map_reduce(
+            _join_windows(windows), llmclient,
+            map_messages=_section_messages("문단별 요약과 5분 단위 시간별 요약"),
+            reduce_messages=lambda partials: _meeting_log_messages(_join_partials(partials), "[구간별 요약]"),
+            direct_messages=lambda text: _meeting_log_messages(text, "[구간별 요약]"),
+            cache=summary_cache, cache_version=SUMMARY_PROMPT_VERSION,
+            on_token=on_token, on_progress=on_progress, site="noteagent.summary_windows",
+        )
+        print(resp_text)
+        return resp_text
+    except Exception as e:
+        print(f"Agent 요약 실패: {e}")
+
+
+async def summarize_all(text, title, on_token=None, on_progress=None):
+    try:
+        resp_text, summary_stats["all"] = await map_reduce(
+            text, llmclient,
+            map_messages=_section_messages("전체 요약, 주제별 요약, 조치사항"),
+            reduce_messages=lambda partials: _summary_all_messages(_join_partials(partials), title, "[구간별 요약]"),
+            direct_messages=lambda text: _summary_all_messages(text, title),
+            cache=summary_cache, cache_version=SUMMARY_PROMPT_VERSION,
+            on_token=on_token, on_progress=on_progress, site="noteagent.summary_all",
+        )
+        print(resp_text)
+        return resp_text
+    except Exception as e:
+        print(f"Agent 요약 실패: {e}")
@@ -0,0 +1,178 @@
+import heapq
+import queue
+import threading
+import time
+
+_SENTINEL = object()  # 스테이지 종료 신호
+
+
+class Stage:
+    """파이프라인의 한 단계: func(job) -> job, workers개의 스레드가 bounded queue에서 꺼내 처리"""
+
+    def __init__(self, name, func, workers=1, maxsize=4):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=maxsize)
+        # 통계
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.total_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, waited, ok):
+        with self._lock:
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+            self.total_seconds += elapsed
+            self.total_wait_seconds += waited
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self):
+        with self._lock:
+            n = self.processed
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "queue_max": self.queue.maxsize,
+                "busy": self.busy,
+                "processed": n,
+                "failed": self.failed,
+                "avg_seconds": self.total_seconds / n if n else 0.0,
+                "max_seconds": self.max_seconds,
+                "avg_wait_seconds": self.total_wait_seconds / n if n else 0.0,
+            }
+
+
+class Pipeline:
+    """
+    스테이지들을 bounded queue로 연결한 멀티스레드 파이프라인
+
+    - submit()은 첫 스테이지 큐가 가득 차면 블로킹합니다 (backpressure).
+    - 스테이지마다 worker 수를 다르게 줄 수 있어 네트워크 대기 단계만 병렬화할 수 있습니다.
+    - publish 콜백은 worker 수와 상관없이 submit 순서대로 호출됩니다.
+    - 스테이지에서 예외가 나면 해당 job은 None이 되어 이후 스테이지를 건너뛰고, 순서만 소비합니다.
+    - 스테이지 함수 안에서 emit(item)을 호출하면 job이 끝나기 전에 publish_item으로 부분 결과를 내보냅니다.
+      앞선 job이 아직 publish되지 않았으면 차례가 올 때까지 모아 두어 순서는 그대로 유지됩니다.
+    """
+
+    def __init__(self, stages, publish, name="pipeline", publish_item=None):
+        self.stages = stages
+        self.publish = publish
+        self.publish_item = publish_item
+        self.name = name
+        self._local = threading.local()  # worker 스레드가 처리 중인 job의 seq
+        self._streamed = {}  # seq -> 차례를 기다리는 부분 결과
+        self._seq = 0
+        self._next_publish = 0
+        self._reorder = []  # (seq, job) 힙
+        self._publish_lock = threading.Lock()
+        self._threads = []
+        self._alive = [0] * len(stages)
+        self._alive_lock = threading.Lock()
+        self.published = 0
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            self._alive[index] = stage.workers
+            for i in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(index,), name=f"{self.name}-{stage.name}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def submit(self, job):
+        seq = self._seq
+        self._seq += 1
+        self.stages[0].queue.put((seq, time.perf_counter(), job))
+        return seq
+
+    def close(self, timeout=None):
+        """남은 job을 모두 처리한 뒤 스레드를 종료"""
+        for _ in range(self.stages[0].workers):
+            self.stages[0].queue.put(_SENTINEL)
+        for t in self._threads:
+            t.join(timeout)
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        while True:
+            item = stage.queue.get()
+            if item is _SENTINEL:
+                break
+            seq, enqueued_at, job = item
+            waited = time.perf_counter() - enqueued_at
+            ok = True
+            t0 = time.perf_counter()
+            with stage._lock:
+                stage.busy += 1
+            self._local.seq = seq
+            try:
+                if job is not None:
+                    job = stage.func(job)
+            except Exception as e:
+                print(f"[{self.name}] {stage.name} 단계 실패 (#{seq}): {e}")
+                job = None
+                ok = False
+            finally:
+                with stage._lock:
+                    stage.busy -= 1
+            stage.record(time.perf_counter() - t0, waited, ok)
+            self._forward(index, seq, job)
+
+        # 마지막 worker가 종료되면 다음 스테이지에 종료 신호 전달
+        with self._alive_lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self.stages[index + 1].queue.put(_SENTINEL)
+
+    def _forward(self, index, seq, job):
+        if index + 1 < len(self.stages):
+            self.stages[index + 1].queue.put((seq, time.perf_counter(), job))
+            return
+        # 마지막 스테이지: 순서를 맞춰 publish
+        with self._publish_lock:
+            heapq.heappush(self._reorder, (seq, job))
+            while self._reorder and self._reorder[0][0] == self._next_publish:
+                _, ready = heapq.heappop(self._reorder)
+                self._next_publish += 1
+                if ready is not None:
+                    try:
+                        self.publish(ready)
+                        self.published += 1
+                    except Exception as e:
+                        print(f"[{self.name}] publish 실패: {e}")
+                # 다음 job이 미리 내보낸 부분 결과는 이제 차례가 왔으므로 바로 publish
+                for item in self._streamed.pop(self._next_publish, []):
+                    self._publish_item(item)
+
+    def emit(self, item):
+        """스테이지 함수 안에서 호출: 현재 job의 부분 결과를 순서를 지켜 바로 publish"""
+        seq = self._local.seq
+        with self._publish_lock:
+            if seq == self._next_publish:
+                self._publish_item(item)
+            else:
+                self._streamed.setdefault(seq, []).append(item)
+
+    def _publish_item(self, item):
+        try:
+            self.publish_item(item)
+        except Exception as e:
+            print(f"[{self.name}] 부분 결과 publish 실패: {e}")
+
+    def stats(self):
+        with self._publish_lock:
+            waiting = len(self._reorder)
+        return {
+            "submitted": self._seq,
+            "published": self.published,
+            "reorder_waiting": waiting,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+        }
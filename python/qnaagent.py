@@ -1,12 +1,18 @@
-from langchain_openai import ChatOpenAI
-from shared import CACHED_VECTOR_STORE
 from langgraph.prebuilt import create_react_agent
-from vectorstore import get_vectorstore
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
+from vectorstore import get_vectorstore, iter_documents, iter_chunks
+from mapreduce import count_tokens
+from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.store.memory import InMemoryStore
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field 
+import os
+import time
+import resources
+import llmclient
+import llmusage
+
+ALL_NOTES_MAX_TOKENS = int(os.getenv("ALL_NOTES_MAX_TOKENS", "8000"))  # get_all_meeting_notes가 agent에 넘기는 최대 토큰
 
 def summarize_meeting(query: str, context) -> str:
     """
@@ -15,39 +21,61 @@ def summarize_meeting(query: str, context) -> str:
 
     검색된 문서를 기반으로 요약을 실행합니다.
     """
-    answer = llm.invoke(f"다음 문서를 참고해서 답변해줘:\n{context}\n질문: {query}")
+    answer = llmclient.chat(f"다음 문서를 참고해서 답변해줘:\n{context}\n질문: {query}", site="qnaagent.summarize_meeting")
     return answer
 
+async def asummarize_meeting(query: str, context) -> str:
+    # agent는 llm 루프에서 실행되므로 tool도 같은 루프에서 바로 await
+    with llmusage.tag(site="qnaagent.summarize_meeting"):
+        return await get_llm().ainvoke(f"다음 문서를 참고해서 답변해줘:\n{context}\n질문: {query}")
+
 class SummarizeMeetingArgs(BaseModel):
   query: str = Field(description="사용자 요청 내용")
   context: str = Field(description="검색된 문서 내용")
 
 summarize_meeting_tool = StructuredTool.from_function(
-        func=summarize_meeting, name="summarize_meeting",
+        func=summarize_meeting, coroutine=asummarize_meeting, name="summarize_meeting",
         description="검색한 내용을 토대로, 관련 내용만 요약해줍니다.",
         args_schema=SummarizeMeetingArgs)
 
 def search_meeting_notes(query: str) -> str:
     """회의록에서 관련 문서를 검색"""
-    global CACHED_VECTOR_STORE
-    CACHED_VECTOR_STORE = get_vectorstore()
-    docs = CACHED_VECTOR_STORE.similarity_search(query, k=5)
+    # 공용 벡터 DB 핸들을 재사용하므로 검색 시간만 걸림
+    t0 = time.perf_counter()
+    docs = get_vectorstore().similarity_search(query, k=5)
+    print(f"회의록 검색: {len(docs)}개, {time.perf_counter() - t0:.3f}초")
     return "\n".join([d.page_content for d in docs])
 
 def get_all_meeting_notes():
-    global CACHED_VECTOR_STORE
-    # 벡터 스토어에서 전체 문서 가져오기
-    CACHED_VECTOR_STORE = get_vectorstore()
-    all_docs = CACHED_VECTOR_STORE.get(include=["documents"])["documents"]
-
-    # 문서 내용만 추출
-    all_texts = [d.page_content if hasattr(d, "page_content") else str(d) for d in all_docs]
-    full_text = "\n".join(all_texts)
-    return full_text
+    """
+    전체 회의 문서를 문서별 요약(digest)으로 가져옴 (ALL_NOTES_MAX_TOKENS 안에서)
+    digest를 페이지 단위로 읽으므로 문서가 늘어도 메모리와 프롬프트 크기가 일정합니다.
+    """
+    lines, used, skipped = [], 0, 0
+    for doc in iter_documents():
+        line = f"[{doc['title']}] {doc['digest']}"
+        tokens = count_tokens(line) + 1
+        if used + tokens > ALL_NOTES_MAX_TOKENS:
+            skipped += 1
+            continue
+        lines.append(line)
+        used += tokens
+    if not lines:
+        # digest가 아직 없으면(/api/rag/digests/backfill 전) 청크를 한도까지만
+        for chunk in iter_chunks(include=("documents",)):
+            tokens = count_tokens(chunk["documents"]) + 1
+            if used + tokens > ALL_NOTES_MAX_TOKENS:
+                lines.append("(이후 문서는 길이 제한으로 생략)")
+                break
+            lines.append(chunk["documents"])
+            used += tokens
+    if skipped:
+        lines.append(f"(그 외 {skipped}개 문서는 길이 제한으로 생략, 특정 내용은 search_meeting_notes로 검색)")
+    return "\n".join(lines)
 
 get_all_meeting_notes_tool = StructuredTool.from_function(
     func=get_all_meeting_notes, name="get_all_meeting_notes",
-    description="회의의 전체 문서를 가져올 수 있습니다"
+    description="회의의 전체 문서를 문서별 요약으로 가져올 수 있습니다"
 )
 
 class SearchMeetingNotesArgs(BaseModel):
@@ -104,17 +132,27 @@ sys_msg = SystemMessage(content="""
 💬 내용2
 """)
 
-llm = ChatOpenAI(model="gpt-4o-mini")
 tools = [summarize_meeting_tool,  search_meeting_notes_tool, summarize_tasks_tool, get_all_meeting_notes_tool]
 checkpointer = MemorySaver()
 store = InMemoryStore()
-agent = create_react_agent(
-    llm.bind_tools(tools),
-    tools=tools,
-    prompt=sys_msg,
-    checkpointer=checkpointer,
-    store=store
-)
+
+def _build_agent():
+    return create_react_agent(
+        get_llm().bind_tools(tools),
+        tools=tools,
+        prompt=sys_msg,
+        checkpointer=checkpointer,
+        store=store
+    )
+
+resources.register("qnaagent.agent", _build_agent)
+
+def get_llm():
+    # 공용 LLM 클라이언트의 모델 (agent와 함께 llm 루프에서 실행)
+    return llmclient.get_chat_model()
+
+def get_agent():
+    return resources.get("qnaagent.agent")
 
 def terminal_chat_with_agent():
     print("=== 컨플루언스 Q&A 및 요약 에이전트 ===")
@@ -127,7 +165,7 @@ def terminal_chat_with_agent():
 
         try:
             # 사용자 입력을 agent에 전달
-            result = agent.invoke({"messages" : HumanMessage(query)}, config={"configurable" : {"thread_id" : "1"}})
+            result = llmclient.run(get_agent().ainvoke({"messages" : HumanMessage(query)}, config={"configurable" : {"thread_id" : "1"}}), site="qnaagent.agent")
 
             # 반환 내용 확인 후 출력
             # agent에 따라 dict 형태일 수 있으니 먼저 확인
@@ -143,16 +181,17 @@ def terminal_chat_with_agent():
             print(f"오류 발생: {e}\n")
 
 # 🚀 agent 호출 함수
-def ask_agent(query: str, thread_id: str = "1") -> str:
+async def ask_agent(query: str, thread_id: str = "1") -> str:
     """
     사용자 질문을 받아 agent를 실행하고, 결과 텍스트만 반환
+    agent는 llm 루프에서 비동기로 실행되어 요청마다 스레드를 잡지 않습니다.
     """
     try:
         # HumanMessage로 감싸서 agent에 전달
-        result = agent.invoke(
+        result = await llmclient.arun(get_agent().ainvoke(
             {"messages" : HumanMessage(query)},
             config={"configurable": {"thread_id": thread_id}}
-        )
+        ), site="qnaagent.agent")
 
         messages = result.get("messages", [])
         for m in result["messages"]:
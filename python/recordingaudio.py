@@ -1,28 +1,40 @@
 import os
-from shared import audio_q
+from shared import audio_q, AUDIO_STOP, capture_stop_event
 import sounddevice as sd
 import numpy as np
 import azure.cognitiveservices.speech as speechsdk
-import threading
+import time as wall_time
+from audioframe import FrameSequencer
+import resources
 
 speech_key = os.getenv("SPEECH_KEY")
 service_region = "koreacentral"
 
-os.makedirs("audiofile", exist_ok=True)  # 디렉터리가 없으면 생성
+def _build_speech_config():
+    speech_config = speechsdk.SpeechConfig(
+        subscription=speech_key,
+        region=service_region
+    )
+    speech_config.speech_recognition_language = "ko-KR"  # 한국어 설정
+    return speech_config
 
-speech_config = speechsdk.SpeechConfig(
-    subscription=speech_key,
-    region=service_region
-)
-audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
-speech_config.speech_recognition_language = "ko-KR"  # 한국어 설정
-speech_recognizer = speechsdk.SpeechRecognizer(
-    speech_config=speech_config,
-    audio_config=audio_config
-)
-conversation_transcriber = speechsdk.transcription.ConversationTranscriber(
-    speech_config=speech_config, audio_config=audio_config
-)
+def _build_audio_config():
+    # 기본 마이크에 바인딩되므로 실시간 회의를 시작할 때만 생성
+    return speechsdk.audio.AudioConfig(use_default_microphone=True)
+
+resources.register("speech_config", _build_speech_config)
+resources.register("audio_config", _build_audio_config)
+resources.register("speech_recognizer", lambda: speechsdk.SpeechRecognizer(
+    speech_config=resources.get("speech_config"),
+    audio_config=resources.get("audio_config")
+))
+resources.register("conversation_transcriber", lambda: speechsdk.transcription.ConversationTranscriber(
+    speech_config=resources.get("speech_config"),
+    audio_config=resources.get("audio_config")
+))
+
+def get_conversation_transcriber():
+    return resources.get("conversation_transcriber")
 
 
 # 오디오 설정 (샘플링 레이트와 채널 수)
@@ -30,18 +42,26 @@ SAMPLERATE = 44100  # 음성 인식에 적합한 샘플링 레이트
 CHANNELS = 1      # 모노 채널
 CHUNK_SIZE_IN_FRAMES = 16000 * 5  # 2초 분량의 오디오 (16000Hz * 2초)
 
+_sequencer = FrameSequencer(SAMPLERATE, CHANNELS)  # 캡처 스트림마다 새로 생성
+
 # 콜백 함수: 오디오 데이터가 들어올 때마다 호출
 def audio_callback(indata, frames, time, status):
     """sounddevice 스트림에서 오디오 데이터를 캡처하고 큐에 넣는 함수"""
     if status:
         print(f"Error in audio stream: {status}")
-    # 들어온 오디오 데이터를 큐에 추가
+    # ADC 입력 시각을 벽시계 시각으로 환산 (스트림 시간을 지원하지 않으면 현재 시각)
+    captured_at = wall_time.time()
+    if time.inputBufferAdcTime > 0:
+        captured_at -= time.currentTime - time.inputBufferAdcTime
+    # 들어온 오디오 데이터를 샘플 레이트/채널/시각/순번과 함께 큐에 추가
     audio_chunk = (indata.copy() * 32767).astype(np.int16)
-    audio_q.put(audio_chunk)
+    audio_q.put(_sequencer.make(audio_chunk, captured_at))
 
 # 오디오 스트림을 열고 실시간 캡처 시작
 def start_audio_capture():
     """마이크 오디오 캡처를 시작하는 함수"""
+    global _sequencer
+    _sequencer = FrameSequencer(SAMPLERATE, CHANNELS)
     try:
         with sd.InputStream(
             samplerate=SAMPLERATE,
@@ -50,7 +70,13 @@ def start_audio_capture():
         ) as stream:
             print("마이크 녹음 시작... 'Ctrl+C'를 눌러 종료하세요.")
             # 스트림이 계속 실행되도록 유지
-            # 이 스레드는 마이크 입력이 끝날 때까지 대기
-            threading.Event().wait()
+            # 이 스레드는 stop_audio_capture()가 호출될 때까지 대기
+            capture_stop_event.wait()
     except Exception as e:
-        print(f"Error starting audio stream: {e}")
\ No newline at end of file
+        print(f"Error starting audio stream: {e}")
+    finally:
+        # 스트림이 닫힌 뒤에 센티널을 넣어 consumer가 남은 오디오까지 처리하고 종료하게 함
+        audio_q.put(AUDIO_STOP)
+
+def stop_audio_capture():
+    capture_stop_event.set()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 무거운 모델/SDK 클라이언트를 처음 사용할 때 생성하는 지연 초기화 레지스트리
+_factories = {}  # {name: factory}
+_instances = {}  # {name: 생성된 객체}
+_lock = threading.RLock()
+
+# 캐시/화자 레지스트리/LLM 사용량 로그 같은 런타임 상태 파일을 모아두는 디렉터리
+# (기본: 이 모듈 옆 data/ - 실행 위치(CWD)와 상관없이 같은 곳, DATA_DIR로 변경)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# 기동 시간 리포트: 모듈 import와 리소스 초기화에 걸린 시간(초)
+startup_report = {"imports": {}, "inits": {}}
+
+
+def register(name, factory):
+    """리소스 생성 함수를 등록 (실제 생성은 get()을 처음 호출할 때)"""
+    _factories[name] = factory
+
+
+def get(name):
+    """리소스를 반환하고, 아직 없으면 생성해서 캐시"""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"등록되지 않은 리소스: {name}")
+            t0 = time.perf_counter()
+            _instances[name] = _factories[name]()
+            startup_report["inits"][name] = time.perf_counter() - t0
+            print(f"리소스 초기화: {name} ({startup_report['inits'][name]:.2f}초)")
+        return _instances[name]
+
+
+def data_path(filename):
+    """DATA_DIR 안의 상태 파일 경로"""
+    return os.path.join(DATA_DIR, filename)
+
+
+def is_loaded(name):
+    return name in _instances
+
+
+def reset(name):
+    """캐시된 리소스를 버려서 다음 get()에서 다시 생성되게 함"""
+    with _lock:
+        _instances.pop(name, None)
+
+
+def module(name):
+    """모듈을 처음 필요할 때 import (import 시간은 startup_report에 기록)"""
+    return get(register_module(name))
+
+
+def register_module(name):
+    """모듈 import를 "module:<name>" 리소스로 등록만 하고 키를 반환 (warm_up으로 미리 import할 때)"""
+    key = f"module:{name}"
+    if key not in _factories:
+        register(key, lambda: _timed_import(name))
+    return key
+
+
+def _timed_import(name):
+    with timed_import(name):
+        return importlib.import_module(name)
+
+
+@contextmanager
+def timed_import(name):
+    """with 블록 안의 import 시간을 기록"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_report["imports"].setdefault(name, time.perf_counter() - t0)
+
+
+def warm_up(names=None, errors=None):
+    """
+    지정한 리소스(없으면 등록된 전체)를 미리 생성하고 각 소요 시간을 반환
+    errors(dict)를 넘기면 생성에 실패한 리소스는 {name: 오류}로 모으고 나머지는 계속 생성합니다.
+    """
+    names = list(_factories) if names is None else names
+    unknown = [name for name in names if name not in _factories]
+    if unknown:
+        raise KeyError(f"등록되지 않은 리소스: {', '.join(unknown)}")
+    result = {}
+    for name in names:
+        t0 = time.perf_counter()
+        try:
+            get(name)
+        except Exception as e:
+            if errors is None:
+                raise
+            errors[name] = repr(e)
+            print(f"리소스 초기화 실패: {name} ({e!r})")
+            continue
+        result[name] = time.perf_counter() - t0
+    return result
+
+
+def report():
+    return {
+        "imports": dict(startup_report["imports"]),
+        "inits": dict(startup_report["inits"]),
+        "registered": sorted(_factories),
+        "loaded": sorted(_instances),
+    }
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import confluence as confluence
 import common as common
 import urllib3
@@ -6,8 +8,27 @@ import html2text
 
 
 markdown_converter = html2text.HTML2Text()
+# Confluence 요청은 llmclient 제한을 거치지 않으므로 동시에 리뷰하는 페이지 수를 따로 제한
+REVIEW_CONCURRENCY = int(os.getenv("REVIEW_CONCURRENCY", "4"))
 
-def main():
+async def review_page(page, label_title, system_prompt):
+    data = await asyncio.to_thread(confluence.get_content, page["id"])
+    if not data:
+        return
+
+    # 리뷰할 페이지 내용 가져오기
+    user_prompt = (((data.get("body") or {}).get("storage") or {}).get("value") or "")
+
+    # 리뷰하고 댓글달기 (LLM 동시 요청 수는 llmclient가 제한)
+    answer = await common.acall_chatgpt(system_prompt, user_prompt, site="review")
+    await asyncio.to_thread(confluence.add_comment, page["id"], answer)
+
+    # 라벨 제거하고 완료 라벨 달기
+    await asyncio.to_thread(confluence.delete_label, page["id"], label_title)
+    await asyncio.to_thread(confluence.post_label, page["id"], label_title + '완료')
+
+
+async def main():
     label_title_list = ['기본기강화', 'UMEET주간회의']
 
     for label_title in label_title_list:
@@ -19,23 +40,19 @@ def main():
         system_prompt_html = confluence.get_content(system_prompt_page_id)['body']['storage']['value']
         system_prompt = markdown_converter.handle(str(system_prompt_html))
 
-        for page in pages:
-            data = confluence.get_content(page["id"])
-            if not data:
-                continue
-
-            # 리뷰할 페이지 내용 가져오기
-            user_prompt = (((data.get("body") or {}).get("storage") or {}).get("value") or "")
+        # 페이지별 리뷰를 동시에 진행 (한 페이지가 실패해도 나머지는 끝까지 진행)
+        semaphore = asyncio.Semaphore(REVIEW_CONCURRENCY)
 
-            # 리뷰하고 댓글달기
-            answer = common.call_chatgpt(system_prompt, user_prompt)
-            confluence.add_comment(page["id"], answer)
+        async def review(page):
+            async with semaphore:
+                await review_page(page, label_title, system_prompt)
 
-            # 라벨 제거하고 완료 라벨 달기
-            confluence.delete_label(page["id"], label_title)
-            confluence.post_label(page["id"], label_title + '완료')
+        results = await asyncio.gather(*(review(page) for page in pages), return_exceptions=True)
+        for page, result in zip(pages, results):
+            if isinstance(result, Exception):
+                print(f"리뷰 실패: {page['title']} ({page['id']}): {result!r}")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
@@ -0,0 +1,200 @@
+import os
+from collections import deque
+import numpy as np
+from audiobuffer import AudioRingBuffer
+
+# 세그먼트 길이/묵음 기준 (초)
+VAD_MIN_SEGMENT = float(os.getenv("VAD_MIN_SEGMENT", "3"))
+VAD_MAX_SEGMENT = float(os.getenv("VAD_MAX_SEGMENT", "30"))
+VAD_MIN_SILENCE = float(os.getenv("VAD_MIN_SILENCE", "0.6"))  # 이 길이 이상 쉬면 문장 경계로 판단
+VAD_MAX_SILENCE = float(os.getenv("VAD_MAX_SILENCE", "2.0"))  # 짧은 발화라도 이만큼 쉬면 내보냄
+VAD_PRE_ROLL = float(os.getenv("VAD_PRE_ROLL", "0.3"))  # 발화 시작 앞에 붙일 여유분
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))  # 절대 최소 음성 에너지
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))  # 노이즈 바닥 대비 음성 판단 마진
+VAD_NOISE_WINDOW = float(os.getenv("VAD_NOISE_WINDOW", "5"))  # 이 시간 동안의 최저 에너지로 노이즈 바닥을 끌어올림
+
+
+class Segment:
+    """전사할 음성 구간"""
+
+    def __init__(self, audio, start, sample_rate, speech_ratio, timestamp=None):
+        self.audio = audio
+        self.start = start  # 스트림 시작 기준 샘플 위치
+        self.sample_rate = sample_rate
+        self.speech_ratio = speech_ratio
+        self.timestamp = timestamp  # 첫 샘플의 캡처 시각 (epoch 초)
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.sample_rate
+
+
+class VoiceSegmenter:
+    """
+    프레임 에너지 기반 VAD로 오디오 스트림을 발화 단위 세그먼트로 나눕니다.
+
+    - 노이즈 바닥을 묵음 프레임으로 계속 추정하고, 그보다 VAD_MARGIN_DB 이상 큰 프레임을 음성으로 봅니다.
+      배경 소음이 갑자기 커져 모든 프레임이 음성으로 판단되는 경우를 위해, 최근 VAD_NOISE_WINDOW초의
+      최저 프레임 에너지가 바닥보다 높으면 바닥을 거기까지 올립니다.
+    - 최소 길이를 넘긴 세그먼트는 VAD_MIN_SILENCE 이상의 쉼에서 자릅니다.
+    - 최대 길이에 도달하면 가장 최근의 쉼(없으면 그 자리)에서 자릅니다.
+    - 음성이 없는 구간은 세그먼트로 내보내지 않고 버립니다.
+    """
+
+    def __init__(self, sample_rate, min_segment=VAD_MIN_SEGMENT, max_segment=VAD_MAX_SEGMENT,
+                 min_silence=VAD_MIN_SILENCE, max_silence=VAD_MAX_SILENCE, pre_roll=VAD_PRE_ROLL,
+                 frame_ms=VAD_FRAME_MS, threshold_db=VAD_THRESHOLD_DB, margin_db=VAD_MARGIN_DB,
+                 noise_window=VAD_NOISE_WINDOW, on_silence=None):
+        self.sample_rate = sample_rate
+        self.on_silence = on_silence  # 묵음 프레임 콜백 (노이즈 프로파일 학습용)
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        frames_per_sec = sample_rate / self.frame_len
+        self.min_frames = max(1, int(min_segment * frames_per_sec))
+        self.max_frames = max(self.min_frames + 1, int(max_segment * frames_per_sec))
+        self.min_silence_frames = max(1, int(min_silence * frames_per_sec))
+        self.max_silence_frames = max(self.min_silence_frames, int(max_silence * frames_per_sec))
+        self.pre_roll_frames = int(pre_roll * frames_per_sec)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        # 최근 noise_window초를 0.5초 블록으로 나눠 블록별 최저 에너지를 보관 (rolling minimum)
+        self.noise_block_frames = max(1, int(0.5 * frames_per_sec))
+        self._block_minima = deque(maxlen=max(1, int(round(noise_window / 0.5))))
+        self._block_min_db = None
+        self._block_count = 0
+
+        self.buffer = AudioRingBuffer((self.max_frames + 2) * self.frame_len)
+        self._flags = []  # 버퍼에 있는 분석 완료 프레임별 음성 여부
+        self._buffer_start = 0  # 버퍼 첫 샘플의 스트림 기준 위치
+        self._noise_floor_db = None
+        self._silence_run = 0
+        self._stream_start_time = None  # 스트림 첫 샘플의 캡처 시각 (push마다 다시 맞춤)
+
+        # 통계
+        self.speech_samples = 0
+        self.skipped_samples = 0
+
+    def _is_speech(self, frame):
+        energy_db = 10 * np.log10(np.mean(frame.astype(np.float64) ** 2) + 1e-10)
+        if self._noise_floor_db is None:
+            self._noise_floor_db = energy_db
+        self._track_minimum(energy_db)
+        speech = energy_db > max(self.threshold_db, self._noise_floor_db + self.margin_db)
+        if not speech:
+            # 묵음 프레임으로 노이즈 바닥 갱신
+            self._noise_floor_db = 0.95 * self._noise_floor_db + 0.05 * energy_db
+            if self.on_silence is not None:
+                self.on_silence(frame)
+        return speech
+
+    def _track_minimum(self, energy_db):
+        self._block_min_db = energy_db if self._block_min_db is None else min(self._block_min_db, energy_db)
+        self._block_count += 1
+        if self._block_count < self.noise_block_frames:
+            return
+        self._block_minima.append(self._block_min_db)
+        self._block_min_db, self._block_count = None, 0
+        if len(self._block_minima) == self._block_minima.maxlen:
+            # 창 전체에서 바닥보다 조용한 프레임이 없었으면 배경 소음이 커진 것
+            self._noise_floor_db = max(self._noise_floor_db, min(self._block_minima))
+
+    def _drop(self, n_frames):
+        n = n_frames * self.frame_len
+        self.buffer.consume(n)
+        del self._flags[:n_frames]
+        self._buffer_start += n
+        self.skipped_samples += n
+
+    def _emit(self, n_frames):
+        """버퍼 앞쪽 n_frames를 세그먼트로 잘라냄 (뒤쪽 묵음은 VAD_MIN_SILENCE만큼만 남김)"""
+        flags = self._flags[:n_frames]
+        last_speech = max(i for i, f in enumerate(flags) if f)
+        keep = min(n_frames, last_speech + 1 + self.min_silence_frames)
+        n = keep * self.frame_len
+        audio = np.array(self.buffer.peek(n))  # 이후 쓰기로 덮어써지지 않도록 복사
+        speech_ratio = sum(flags[:keep]) / keep
+        timestamp = None
+        if self._stream_start_time is not None:
+            timestamp = self._stream_start_time + self._buffer_start / self.sample_rate
+        segment = Segment(audio, self._buffer_start, self.sample_rate, speech_ratio, timestamp)
+
+        self.buffer.consume(n)
+        del self._flags[:keep]
+        self._buffer_start += n
+        self.speech_samples += n
+        if keep < n_frames:
+            self._drop(n_frames - keep)
+        self._silence_run = 0
+        return segment
+
+    def _on_frame(self, speech):
+        """프레임 하나를 반영하고, 세그먼트가 완성되면 반환"""
+        self._flags.append(speech)
+        if not any(self._flags):
+            # 발화 전: pre-roll만 남기고 묵음은 버림
+            excess = len(self._flags) - self.pre_roll_frames
+            if excess > 0:
+                self._drop(excess)
+            return None
+
+        self._silence_run = 0 if speech else self._silence_run + 1
+        n_frames = len(self._flags)
+        if self._silence_run >= self.min_silence_frames and n_frames >= self.min_frames:
+            return self._emit(n_frames)
+        if self._silence_run >= self.max_silence_frames:
+            return self._emit(n_frames)
+        if n_frames >= self.max_frames:
+            # 최대 길이 도달: 뒤쪽 절반에서 가장 최근 묵음 프레임에서 자름
+            cut = n_frames
+            for i in range(n_frames - 1, n_frames // 2, -1):
+                if not self._flags[i] and any(self._flags[:i]):
+                    cut = i + 1
+                    break
+            segment = self._emit(cut)
+            self._silence_run = 0
+            for f in reversed(self._flags):
+                if f:
+                    break
+                self._silence_run += 1
+            return segment
+        return None
+
+    def push(self, samples, timestamp=None):
+        """오디오 청크(첫 샘플 캡처 시각 timestamp)를 넣고, 완성된 세그먼트 리스트를 반환"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if timestamp is not None:
+            # 캡처 시각으로 스트림 기준점을 다시 맞춰 장치 클럭 드리프트/누락을 보정
+            self._stream_start_time = timestamp - (self._buffer_start + len(self.buffer)) / self.sample_rate
+        segments = []
+        while len(samples):
+            free = self.buffer.capacity - len(self.buffer)
+            piece, samples = samples[:free], samples[free:]
+            self.buffer.write(piece)
+            analyzed = len(self._flags) * self.frame_len
+            while len(self.buffer) - analyzed >= self.frame_len:
+                frame = self.buffer.peek(analyzed + self.frame_len)[analyzed:]
+                segment = self._on_frame(self._is_speech(frame))
+                if segment is not None:
+                    segments.append(segment)
+                analyzed = len(self._flags) * self.frame_len
+        return segments
+
+    def flush(self):
+        """남은 오디오 중 음성이 있으면 마지막 세그먼트로 반환"""
+        segment = None
+        if any(self._flags):
+            segment = self._emit(len(self._flags))
+        remaining = len(self.buffer)
+        self.buffer.consume()
+        self._flags.clear()
+        self._buffer_start += remaining
+        self.skipped_samples += remaining
+        return segment
+
+    def stats(self):
+        total = self.speech_samples + self.skipped_samples
+        return {
+            "segment_seconds": self.speech_samples / self.sample_rate,
+            "skipped_seconds": self.skipped_samples / self.sample_rate,
+            "kept_ratio": self.speech_samples / total if total else 0.0,
+        }
@@ -1,7 +1,10 @@
 import asyncio
 import queue
+import threading
 
 audio_q = queue.Queue()
+AUDIO_STOP = object()  # audio_q 종료 센티널 (캡처가 끝난 뒤 넣으므로 그 앞의 오디오는 모두 처리됨)
+capture_stop_event = threading.Event()  # 마이크 캡처 스레드 종료 신호
 
 stop_event = asyncio.Event()
 main_task = None  # main_loop를 가리키는 태스크
@@ -9,5 +12,3 @@ main_task = None  # main_loop를 가리키는 태스크
 docs = []
 vector_store = None
 vectorstore_tool = None
-
-CACHED_VECTOR_STORE = None
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import os
+import re
+import threading
+from resources import data_path
+
+SPEAKER_REGISTRY_PATH = os.getenv("SPEAKER_REGISTRY_PATH", data_path("speaker_registry.json"))
+SPEAKER_MAX_LLM_TRIES = int(os.getenv("SPEAKER_MAX_LLM_TRIES", "3"))  # 화자당 LLM 이름 확인 최대 횟수
+
+# 발화 시작이나 공백/문장부호 뒤에서만 (오전/사전의 "전", "전문가"의 "전"은 제외: "전"은 띄어 쓴 경우만)
+_START = r"(?:^|(?<=[\s,.!?]))"
+_SUBJECT = _START + r"(?:(?:저는|제 이름은|나는)\s*|전\s+)"
+# "저는 김아영입니다", "제 이름은 김아영이고", "안녕하세요, 이주혜입니다" 같은 자기소개
+_INTRO_PATTERNS = [
+    re.compile(_SUBJECT + r"([가-힣]{2,4}?)(?:이라고|라고)\s*(?:합니다|해요|하고)"),
+    re.compile(_SUBJECT + r"([가-힣]{2,4}?)(?:입니다|이에요|예요|이고요|이고|인데요)"),
+    re.compile(_START + r"안녕하(?:세요|십니까)[\s,.!]*([가-힣]{2,4}?)(?:입니다|이에요|예요)"),
+]
+# 이름처럼 보이려면 흔한 성으로 시작해야 함 ("찬성", "반대" 같은 말 제외)
+_SURNAMES = set(
+    "김이박최정강조윤장임한오서신권황안송전홍유고문양손배백허남심노하곽성차주우구민류나진지엄채원천방공현함변염여추도소석선설마길연위표명"
+)
+_COMPOUND_SURNAMES = {"남궁", "황보", "제갈", "선우", "독고", "사공", "서문"}
+# 자기소개처럼 보이지만 이름이 아닌 말
+_NOT_NAMES = {
+    "개발자", "담당자", "팀장", "팀원", "매니저", "기획자", "디자이너", "리더", "대표", "사원", "대리", "과장",
+    "차장", "부장", "신입", "여기", "오늘", "이번", "그냥", "일단", "지금", "처음", "다음", "괜찮", "좋",
+}
+# 정규식으로 못 찾았지만 자기소개일 수 있는 발화 (새 화자일 때만 LLM으로 확인)
+_INTRO_CUES = ("저는", "제 이름", "라고 합니다", "이라고 합니다", "소개")
+_LABEL = re.compile(r"^화자 ([A-Z]+)$")
+
+
+def _looks_like_name(word):
+    if word in _NOT_NAMES:
+        return False
+    if word[:2] in _COMPOUND_SURNAMES and len(word) >= 3:
+        return True
+    return word[0] in _SURNAMES
+
+
+def detect_name(text):
+    """자기소개 발화에서 이름 후보를 찾으면 반환, 없으면 None (확정은 SpeakerRegistry가 resolver로 확인)"""
+    for pattern in _INTRO_PATTERNS:
+        for match in pattern.finditer(text or ""):
+            name = match.group(1)
+            if _looks_like_name(name):
+                return name
+    return None
+
+
+class SpeakerRegistry:
+    """
+    Azure 화자 라벨(A, B, ...)과 이름의 매핑을 증분으로 관리합니다.
+
+    - 발화가 들어올 때마다 자기소개를 감지해서 아직 이름이 없는 라벨에 한 번만 이름을 지정합니다.
+    - 매핑은 label_map에 채우고 path가 있으면 파일에 저장해서 재시작 후에도 재사용합니다.
+    - 정규식으로 찾은 이름은 후보일 뿐이고, resolver(text)가 그 발화를 한 번 확인해서(잘못 인식된 이름은
+      정정) 등록합니다. 정규식에 안 걸린 자기소개 단서("저는", "소개" 등)도 resolver로 확인합니다.
+      resolver 호출은 이름이 없는 라벨에 대해서만 SPEAKER_MAX_LLM_TRIES번까지입니다.
+    - use_llm=False(Azure 이벤트 스레드)이면 후보만 기억해 두고, 그 라벨의 다음 use_llm=True 호출에서 확인합니다.
+    - resolver가 없으면 정규식 후보를 그대로 등록합니다.
+    """
+
+    def __init__(self, label_map, path=SPEAKER_REGISTRY_PATH, resolver=None, max_llm_tries=SPEAKER_MAX_LLM_TRIES):
+        self.label_map = label_map
+        self.path = path
+        self.resolver = resolver
+        self.max_llm_tries = max_llm_tries
+        self._llm_tries = {}  # label -> LLM 확인 횟수
+        self._candidates = {}  # label -> 확인을 기다리는 자기소개 발화 (정규식 후보)
+        self._lock = threading.RLock()
+        self.stats = {"observed": 0, "regex_hits": 0, "llm_calls": 0, "llm_hits": 0, "llm_rejected": 0}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.label_map.update(data.get("labels", {}))
+            self._llm_tries.update(data.get("llm_tries", {}))
+        except Exception as e:
+            print(f"화자 레지스트리 로드 실패: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"labels": self.label_map, "llm_tries": self._llm_tries}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"화자 레지스트리 저장 실패: {e}")
+
+    def reset(self):
+        """새 회의 시작 시 매핑 초기화"""
+        with self._lock:
+            self.label_map.clear()
+            self._llm_tries.clear()
+            self._candidates.clear()
+            self._save()
+
+    def _register(self, label, name):
+        if name in self.label_map.values():
+            # 같은 이름이 이미 다른 화자에 있으면 Azure가 한 사람을 둘로 나눈 경우일 수 있어 그대로 둠
+            print(f"화자 {label}: '{name}'은 이미 등록된 이름이라 건너뜀")
+            return
+        self.label_map[label] = name
+        print(f"화자 등록: 화자 {label} -> {name}")
+        self._save()
+
+    def observe(self, label, text, use_llm=True):
+        """라벨의 발화를 보고, 이름이 아직 없으면 자기소개를 감지해서 등록. 현재 이름(없으면 None) 반환"""
+        if not label:
+            return None
+        with self._lock:
+            self.stats["observed"] += 1
+            if label in self.label_map:
+                return self.label_map[label]
+            candidate = detect_name(text)
+            if candidate:
+                self.stats["regex_hits"] += 1
+                if self.resolver is None:
+                    self._register(label, candidate)
+                    return self.label_map.get(label)
+                self._candidates[label] = text
+            if not (use_llm and self.resolver):
+                return None
+            if self._llm_tries.get(label, 0) >= self.max_llm_tries:
+                return None
+            # 정규식 후보 발화가 있으면 그것을, 없으면 자기소개 단서가 있는 이번 발화를 확인
+            intro = self._candidates.pop(label, None)
+            if intro is None and any(cue in text for cue in _INTRO_CUES):
+                intro = text
+            if intro is None:
+                return None
+            self._llm_tries[label] = self._llm_tries.get(label, 0) + 1
+            self.stats["llm_calls"] += 1
+        # LLM 호출은 잠금 밖에서 (다른 발화의 매핑 적용을 막지 않도록)
+        try:
+            name = self.resolver(intro)
+        except Exception as e:
+            print(f"화자 이름 확인 실패: {e}")
+            name = None
+        with self._lock:
+            if name and label not in self.label_map:
+                self.stats["llm_hits"] += 1
+                self._register(label, name)
+            else:
+                self.stats["llm_rejected"] += 1
+                self._save()
+            return self.label_map.get(label)
+
+    def label_entry(self, entry, use_llm=True):
+        """회의록 항목의 "화자 X"를 등록된 이름으로 바꿔서 반환 (자기소개면 먼저 등록)"""
+        match = _LABEL.match(entry.get("speaker", ""))
+        if not match:
+            return entry
+        name = self.observe(match.group(1), entry.get("text", ""), use_llm)
+        if name:
+            entry["speaker"] = name
+        return entry
+
+    def relabel(self, log):
+        """이미 기록된 회의록에서 이름이 등록된 "화자 X"를 제자리에서 바꿈 (LLM 호출 없음)"""
+        with self._lock:
+            for entry in log:
+                match = _LABEL.match(entry.get("speaker", ""))
+                if match and match.group(1) in self.label_map:
+                    entry["speaker"] = self.label_map[match.group(1)]
+        return log
@@ -0,0 +1,180 @@
+import io
+import os
+import sys
+import threading
+import time
+import numpy as np
+import soundfile as sf
+from openai import OpenAI
+from audiocodec import convert_for_upload, resample, to_mono
+from audioarchive import archive_audio
+import resources
+
+# 전사 엔진 설정
+STT_ENGINE = os.getenv("STT_ENGINE", "remote")  # remote | local
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "ko")
+REMOTE_WHISPER_MODEL = os.getenv("REMOTE_WHISPER_MODEL", "whisper-1")
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_DEVICE = os.getenv("LOCAL_WHISPER_DEVICE", "cpu")
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_WINDOW_SECONDS = 30  # Whisper 모델 입력 윈도우
+
+
+class TranscriptionBackend:
+    """
+    전사 엔진 공통 인터페이스
+
+    - transcribe_batch([(audio, sample_rate), ...]) -> [text, ...]
+    - transcribe_file(file_bytes) -> text  (업로드된 오디오 파일)
+    """
+
+    name = "base"
+
+    def transcribe(self, audio, sample_rate):
+        return self.transcribe_batch([(audio, sample_rate)])[0]
+
+    def transcribe_batch(self, segments):
+        raise NotImplementedError
+
+    def transcribe_file(self, file_bytes):
+        raise NotImplementedError
+
+
+class RemoteWhisperBackend(TranscriptionBackend):
+    """OpenAI whisper-1 API (세그먼트마다 1회 요청)"""
+
+    name = "remote"
+
+    def __init__(self, model=REMOTE_WHISPER_MODEL, language=STT_LANGUAGE):
+        self.model = model
+        self.language = language
+        self.client = OpenAI()
+        self._local = threading.local()  # 전사 worker 스레드별 업로드 버퍼
+
+    @property
+    def _upload_buffer(self):
+        # 스레드마다 하나씩 만들어 재사용
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            buf = self._local.buffer = io.BytesIO()
+        return buf
+
+    def transcribe_batch(self, segments):
+        texts = []
+        buf = self._upload_buffer
+        for audio, sample_rate in segments:
+            # 다운믹스 + 16000Hz 리샘플링 + 압축 인코딩 (디스크를 거치지 않고 재사용 메모리 버퍼 사용)
+            _, upload_info = convert_for_upload(audio, sample_rate, buf)
+            print(f"업로드 변환: {upload_info['format']} {upload_info['sample_rate']}Hz, "
+                  f"{upload_info['raw_bytes']} -> {upload_info['sent_bytes']} bytes "
+                  f"({upload_info['ratio']:.1f}x), 인코딩 {upload_info['encode_seconds'] * 1000:.1f}ms")
+            archive_audio(buf, buf.name.rsplit(".", 1)[-1])
+            result = self.client.audio.transcriptions.create(
+                model=self.model,
+                file=buf,
+                language=self.language
+            )
+            texts.append(result.text)
+        return texts
+
+    def transcribe_file(self, file_bytes):
+        result = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=file_bytes,
+            language=self.language
+        )
+        return result.text
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    로컬 openai-whisper 모델 (네트워크 왕복 없음)
+    30초 이하 세그먼트들은 mel 스펙트로그램을 쌓아 한 번의 decode로 배치 추론합니다.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=LOCAL_WHISPER_MODEL, device=LOCAL_WHISPER_DEVICE, language=STT_LANGUAGE):
+        import torch
+        import whisper
+        self._torch = torch
+        self._whisper = whisper
+        self.model = whisper.load_model(model_name, device=device)
+        self.language = language
+        self.fp16 = device != "cpu"
+        self._lock = threading.Lock()  # 모델 하나를 여러 전사 worker가 공유하므로 추론은 한 번에 하나씩
+
+    def _prepare(self, audio, sample_rate):
+        audio = resample(to_mono(np.asarray(audio, dtype=np.float32)), sample_rate, WHISPER_SAMPLE_RATE)
+        return np.ascontiguousarray(audio, dtype=np.float32)
+
+    def transcribe_batch(self, segments):
+        with self._lock:
+            return self._transcribe_batch(segments)
+
+    def _transcribe_batch(self, segments):
+        whisper = self._whisper
+        prepared = [self._prepare(audio, sample_rate) for audio, sample_rate in segments]
+        texts = [None] * len(prepared)
+
+        # 30초 이하만 한 배치로 디코딩, 긴 오디오는 transcribe()로 슬라이딩 처리
+        short = [i for i, a in enumerate(prepared) if len(a) <= WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE]
+        if short:
+            mels = [
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(prepared[i]), n_mels=self.model.dims.n_mels)
+                for i in short
+            ]
+            batch = self._torch.stack(mels).to(self.model.device)
+            options = whisper.DecodingOptions(language=self.language, fp16=self.fp16, without_timestamps=True)
+            results = whisper.decode(self.model, batch, options)
+            for i, result in zip(short, results):
+                texts[i] = result.text
+        for i, audio in enumerate(prepared):
+            if texts[i] is None:
+                texts[i] = self.model.transcribe(audio, language=self.language, fp16=self.fp16)["text"]
+        return texts
+
+    def transcribe_file(self, file_bytes):
+        audio, sample_rate = sf.read(io.BytesIO(file_bytes), dtype="float32")
+        return self.transcribe(audio, sample_rate)
+
+
+_BACKENDS = {
+    "remote": RemoteWhisperBackend,
+    "local": LocalWhisperBackend,
+}
+for _name, _cls in _BACKENDS.items():
+    resources.register(f"stt.{_name}", _cls)
+
+
+def get_backend(name=None):
+    """설정(STT_ENGINE)에 맞는 전사 엔진을 한 번만 생성해서 재사용"""
+    name = name or STT_ENGINE
+    if name not in _BACKENDS:
+        raise ValueError(f"지원하지 않는 전사 엔진: {name}")
+    return resources.get(f"stt.{name}")
+
+
+def _bench(path, engines=("remote", "local"), batch_size=4):
+    """같은 오디오 파일로 엔진별 전사 시간을 비교 (30초 단위로 나눠 batch_size씩 처리)"""
+    audio, sample_rate = sf.read(path, dtype="float32")
+    audio = to_mono(audio)
+    window = WHISPER_WINDOW_SECONDS * sample_rate
+    segments = [(audio[i:i + window], sample_rate) for i in range(0, len(audio), window)]
+    duration = len(audio) / sample_rate
+    for name in engines:
+        backend = get_backend(name)
+        t0 = time.perf_counter()
+        texts = []
+        for i in range(0, len(segments), batch_size):
+            texts.extend(backend.transcribe_batch(segments[i:i + batch_size]))
+        elapsed = time.perf_counter() - t0
+        print(f"[{name}] {duration:.1f}초 오디오, {len(segments)}개 세그먼트: "
+              f"{elapsed:.2f}초 (실시간 대비 {elapsed / duration:.2f}x)")
+        print(f"  {' '.join(texts)[:200]}")
+
+
+if __name__ == "__main__":
+    # 사용법: python sttbackend.py sample.wav [remote,local]
+    _bench(sys.argv[1], tuple(sys.argv[2].split(",")) if len(sys.argv) > 2 else ("remote", "local"))
@@ -0,0 +1,50 @@
+import hashlib
+import os
+import re
+import unicodedata
+from lrustore import LRUStore
+from resources import data_path
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", data_path("summary_cache.sqlite3"))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """공백/유니코드 정규화 (프론트에서 줄바꿈이나 공백만 달라진 회의록은 같은 키)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+class SummaryCache:
+    """
+    정규화한 회의록 + 제목 + 프롬프트 버전의 해시를 키로 요약 결과를 SQLite에 저장합니다.
+
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다 (LRUStore).
+    - kind별(summary, summaryall, section ...) hit/miss를 집계합니다.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.store = LRUStore(path, "summary_cache", max_bytes, label="요약 캐시")
+
+    @staticmethod
+    def key(kind, text, title="", version=""):
+        h = hashlib.sha256()
+        for part in (kind, version, normalize(title), normalize(text)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return f"{kind}:{h.hexdigest()}"
+
+    def get(self, key):
+        return self.store.get_many([key], key.split(":", 1)[0]).get(key)
+
+    def put(self, key, value):
+        if value is None:
+            return
+        self.store.put_many([(key, key.split(":", 1)[0], value, len(value.encode("utf-8")))])
+
+    def stats(self):
+        return self.store.stats()
+
+
+summary_cache = SummaryCache()
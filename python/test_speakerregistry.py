@@ -0,0 +1,46 @@
+import pytest
+from speakerregistry import SpeakerRegistry, detect_name
+
+
+@pytest.mark.parametrize("text", [
+    "오전 회의입니다",
+    "사전 준비입니다",
+    "이건 전문가입니다",
+    "저는 찬성입니다",
+    "전 반대예요",
+    "저는 개발자입니다",
+    "저는 오늘 발표자입니다",
+])
+def test_ordinary_speech_is_not_a_name(text):
+    assert detect_name(text) is None
+
+
+@pytest.mark.parametrize("text, name", [
+    ("저는 김아영입니다", "김아영"),
+    ("안녕하세요, 이주혜입니다", "이주혜"),
+    ("제 이름은 박민수라고 합니다", "박민수"),
+    ("네 전 최지훈이에요", "최지훈"),
+    ("저는 남궁민입니다", "남궁민"),
+])
+def test_introduction_is_a_name(text, name):
+    assert detect_name(text) == name
+
+
+def test_regex_candidate_is_confirmed_by_resolver():
+    calls = []
+
+    def resolver(text):
+        calls.append(text)
+        return "김아영"  # 잘못 인식된 "김아"를 정정
+
+    registry = SpeakerRegistry({}, path=None, resolver=resolver)
+    # Azure 이벤트(use_llm=False)에서는 후보만 기억
+    assert registry.observe("A", "저는 김아입니다", use_llm=False) is None
+    assert registry.observe("A", "다음 안건으로 넘어가죠") == "김아영"
+    assert calls == ["저는 김아입니다"]
+
+
+def test_rejected_candidate_is_not_registered():
+    registry = SpeakerRegistry({}, path=None, resolver=lambda text: None)
+    assert registry.observe("A", "저는 정상입니다") is None
+    assert registry.label_map == {}
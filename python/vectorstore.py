@@ -1,11 +1,20 @@
-import common
-from langchain_openai import ChatOpenAI
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import llmclient
+import resources
+from embeddingcache import CachedEmbeddings, embedding_cache
+from confluencefetch import fetch_pages
+from mapreduce import map_reduce
+from summarycache import summary_cache
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
-from langchain.agents import Tool
-from langchain.chains import RetrievalQA
 from langchain.schema import Document
+from langchain_core.messages import SystemMessage
 
 # embeddings_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
@@ -20,58 +29,311 @@ from langchain.schema import Document
 
 # 💡 모든 프로세스가 접근할 수 있는 저장 경로 정의
 PERSIST_DIR = "./chroma_vector_db"
+# Confluence 페이지 id -> 버전/제목/라벨/청크 수 (변경된 페이지만 다시 임베딩)
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(PERSIST_DIR, "ingest_manifest.json"))
+# 문서별 요약(digest): 수집할 때 만들어 청크 옆 컬렉션에 저장 (전체 문서 질문은 digest로 답함)
+DIGEST_MAX_CHARS = int(os.getenv("DIGEST_MAX_CHARS", "600"))
+DIGEST_PROMPT_VERSION = "1"
+DOCUMENT_PAGE_SIZE = int(os.getenv("DOCUMENT_PAGE_SIZE", "50"))  # 문서/청크를 한 번에 읽는 개수
 
-def create_vectorstore(docs):
-    global CACHED_VECTOR_STORE
+# 임베딩은 청크 해시로 캐시해서 이미 임베딩한 텍스트는 다시 보내지 않음
+resources.register("vectorstore.embeddings", lambda: CachedEmbeddings(OpenAIEmbeddings(), embedding_cache))
 
+
+def get_embeddings():
+    return resources.get("vectorstore.embeddings")
+
+
+# 영속 컬렉션은 프로세스에서 한 번만 열고 qnaagent/vectorstore/main이 같은 핸들을 사용
+# (쓰기도 이 핸들로 하므로 create_docs/update_docs 결과가 바로 검색에 보임)
+resources.register("vectorstore.db", lambda: Chroma(
+    persist_directory=PERSIST_DIR,
+    embedding_function=get_embeddings(),  # 임베딩 함수는 필수
+    collection_name="my_db"
+))
+# 문서 id(Confluence 페이지 id, 회의록은 note:<해시>) -> digest, 메타데이터 {"id", "title", "url", "chars"}
+resources.register("vectorstore.digests", lambda: Chroma(
+    persist_directory=PERSIST_DIR,
+    embedding_function=get_embeddings(),
+    collection_name="my_db_digests"
+))
+
+
+def get_vectorstore():
+    """프로세스 공용 벡터 DB 핸들 (처음 호출할 때 한 번 열림)"""
+    return resources.get("vectorstore.db")
+
+def get_digest_store():
+    return resources.get("vectorstore.digests")
+
+def _digest_messages(title, text, source="문서 원문"):
+    return [SystemMessage(content=f"""당신은 사내 회의록/문서 색인을 만드는 요약가입니다. 아래 문서를 나중에 여러 문서와 함께 훑어볼 수 있도록
+{DIGEST_MAX_CHARS}자 이내로 요약하세요.
+
+[문서 제목]
+{title}
+
+[{source}]
+---
+{text}
+---
+
+요청사항:
+- 회의/문서의 목적, 주요 논의 주제, 결정 사항, 조치사항(담당자, 기한)을 빠짐없이 짧게 적습니다.
+- 날짜, 시스템명, 담당자 이름 같은 고유명사는 그대로 남깁니다.
+- 문장은 간결하게, 목록 없이 한 문단으로 작성합니다.""")]
+
+async def make_digest(title, text):
+    """문서 하나의 digest (긴 문서는 map-reduce, 같은 제목+본문은 캐시에서). 실패하면 본문 앞부분"""
+    key = summary_cache.key("digest", text, title, DIGEST_PROMPT_VERSION)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        digest, _ = await map_reduce(
+            text, llmclient,
+            map_messages=lambda section, index, total: _digest_messages(title, section, f"문서 구간 {index}"),
+            reduce_messages=lambda partials: _digest_messages(title, "\n\n".join(partials), "구간별 요약"),
+            direct_messages=lambda text: _digest_messages(title, text),
+            cache=summary_cache, cache_version=DIGEST_PROMPT_VERSION, site="vectorstore.digest",
+        )
+    except Exception as e:
+        print(f"문서 요약 실패 ({title}): {e}")
+        return text[:DIGEST_MAX_CHARS]
+    summary_cache.put(key, digest)
+    return digest
+
+async def store_digests(docs, digests=None):
+    """
+    docs: [{"id", "title", "url", "text"}] 의 digest를 digest 컬렉션에 저장 (같은 id는 교체)
+    digests를 주면(방금 만든 요약 등) 그대로 쓰고, 없으면 make_digest로 만듭니다.
+    """
+    if not docs:
+        return 0
+    if digests is None:
+        digests = await asyncio.gather(*(make_digest(d["title"], d["text"]) for d in docs))
+    db = get_digest_store()
+
+    def write():
+        ids = [d["id"] for d in docs]
+        db.delete(ids=ids)
+        db.add_texts(digests, metadatas=[
+            {"id": d["id"], "title": d["title"] or "", "url": d.get("url") or "", "chars": len(d["text"])} for d in docs
+        ], ids=ids)
+        db.persist()
+    await asyncio.to_thread(write)
+    return len(docs)
+
+def _iter_collection(db, page_size, include, where=None):
+    # limit/offset으로 page_size개씩 읽어서 컬렉션 전체를 한 번에 메모리에 올리지 않음
+    offset = 0
+    while True:
+        page = db.get(where=where, limit=page_size, offset=offset, include=include)
+        rows = len(page["ids"])
+        for i in range(rows):
+            yield {"id": page["ids"][i], **{field: page[field][i] for field in include}}
+        if rows < page_size:
+            return
+        offset += page_size
+
+def iter_documents(page_size=DOCUMENT_PAGE_SIZE):
+    """문서별 digest를 page_size개씩 읽어서 하나씩 반환: {"id", "title", "url", "digest"}"""
+    for row in _iter_collection(get_digest_store(), page_size, ["documents", "metadatas"]):
+        meta = row["metadatas"] or {}
+        yield {"id": row["id"], "title": meta.get("title", ""), "url": meta.get("url", ""), "digest": row["documents"]}
+
+def iter_chunks(page_size=DOCUMENT_PAGE_SIZE, include=("documents", "metadatas"), where=None):
+    """청크를 page_size개씩 읽어서 하나씩 반환: {"id", "documents", "metadatas"}"""
+    return _iter_collection(get_vectorstore(), page_size, list(include), where)
+
+def list_documents(offset=0, limit=DOCUMENT_PAGE_SIZE):
+    page = get_digest_store().get(limit=limit, offset=offset, include=["documents", "metadatas"])
+    return [
+        {"id": doc_id, "title": (meta or {}).get("title", ""), "url": (meta or {}).get("url", ""), "digest": digest}
+        for doc_id, digest, meta in zip(page["ids"], page["documents"], page["metadatas"])
+    ]
+
+def _doc_key(meta):
+    # 문서 id 메타데이터가 없는 예전 청크는 제목으로 묶음
+    meta = meta or {}
+    return ("id", meta["id"]) if meta.get("id") else ("title", meta.get("title", ""))
+
+async def backfill_digests(page_size=DOCUMENT_PAGE_SIZE):
+    """digest가 없는 기존 문서(digest 도입 전에 넣은 청크)의 digest를 만듦. 반환: 만든 digest 수"""
+    have = {row["id"] for row in _iter_collection(get_digest_store(), page_size, [])}
+    missing = {}
+    for row in iter_chunks(page_size, include=("metadatas",)):
+        field, value = _doc_key(row["metadatas"])
+        doc_id = value if field == "id" else f"title:{value}"
+        if doc_id not in have and doc_id not in missing:
+            missing[doc_id] = (field, value, (row["metadatas"] or {}).get("url", ""))
+    created = 0
+    items = list(missing.items())
+    for i in range(0, len(items), page_size):
+        # page_size개 문서씩만 본문을 읽어서 digest 생성
+        batch = []
+        for doc_id, (field, value, url) in items[i:i + page_size]:
+            rows = await asyncio.to_thread(lambda: list(iter_chunks(page_size, ("documents", "metadatas"), {field: value})))
+            title = (rows[0]["metadatas"] or {}).get("title", "") if rows else ""
+            batch.append({"id": doc_id, "title": title, "url": url, "text": "\n".join(r["documents"] for r in rows)})
+        created += await store_digests(batch)
+    print(f"digest 생성: {created}개 (기존 {len(have)}개)")
+    return created
+
+def _split(docs):
     text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
     chunk_size=300,
     chunk_overlap=50)
-    splits = text_splitter.split_documents(docs)
-    vectorstore = Chroma.from_documents(
-        documents=splits, embedding=OpenAIEmbeddings(), collection_name="my_db",
-         persist_directory=PERSIST_DIR
-    )
-    CACHED_VECTOR_STORE = vectorstore
-    vectorstore.persist() 
-    retriever = vectorstore.as_retriever()
-    llm = ChatOpenAI(model="gpt-4o-mini")
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=retriever)
-    print(f"{len(docs)}개의 문서를 불러왔습니다.")
-    print(docs[0])  # 첫 문서 내용 일부 확인
-
-    vectorstore_tool = Tool(
-        name="seulgi_note_retriever",
-        description="A retriever for accessing information stored in the vectorstore. Use this tool to answer questions about the conversation transcript. Input should be a question.",
-        func=qa_chain.invoke
-    )
-    return vectorstore
+    return text_splitter.split_documents(docs)
 
-def get_vectorstore():
-    return Chroma(
-                persist_directory=PERSIST_DIR, 
-                embedding_function=OpenAIEmbeddings(), # 임베딩 함수는 필수
-                collection_name="my_db"
-            )
-
-def create_docs(pages):
-    global CACHED_VECTOR_STORE
-    docs = []
-    for p in pages:
-        page = common.confluence_get_body_view(p["id"])
-        md = common.html_to_markdown(page["html"])
-        if not md.strip():
-            continue
-        docs.append(Document(
-            page_content=md,
-            metadata={"title": page["title"], "url": page["url"], "id": p["id"]}
-        ))
-    CACHED_VECTOR_STORE = create_vectorstore(docs)
-
-async def update_docs(text, title):
-    global CACHED_VECTOR_STORE
-    doc = Document(page_content=text, metadata={"title": title})
+
+class IngestManifest:
+    """
+    벡터 DB에 들어간 Confluence 페이지의 버전 기록 (JSON 파일)
+    {page_id: {"version", "title", "labels", "chunks"}}
+    """
+
+    def __init__(self, path=INGEST_MANIFEST_PATH):
+        self.path = path
+        self.pages = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.pages = json.load(f).get("pages", {})
+            except Exception as e:
+                print(f"수집 기록 로드 실패: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"pages": self.pages}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"수집 기록 저장 실패: {e}")
+
+    def is_current(self, page_id, version):
+        entry = self.pages.get(page_id)
+        return entry is not None and version is not None and entry.get("version") == version
+
+
+ingest_manifest = IngestManifest()
+
+
+def _delete_page_chunks(db, page_id):
+    # 페이지 id 메타데이터로 지움 (manifest 이전에 중복으로 쌓인 청크도 함께 정리)
+    ids = db.get(where={"id": page_id}, include=[])["ids"]
+    if ids:
+        db.delete(ids=ids)
+    get_digest_store().delete(ids=[page_id])
+    return len(ids)
+
+
+async def create_docs(pages, label=None, complete=True):
+    """
+    라벨 페이지들을 벡터 DB에 반영합니다. ingest_manifest의 버전과 같은 페이지는 본문을 가져오지도,
+    임베딩하지도 않고, 새 페이지/버전이 바뀐 페이지만 기존 청크를 지운 뒤 다시 넣습니다.
+    바뀐 페이지의 본문은 동시에 가져와 프로세스 풀에서 텍스트로 변환합니다 (confluencefetch).
+    label을 주면 이전에 이 라벨로 들어왔지만 이번 목록에 없는 페이지의 청크도 지웁니다.
+    complete=False(검색이 중간에 끊긴 목록)이면 빠진 페이지를 지우지 않고 stats["removal_skipped"]에 남깁니다.
+    반환: 신규/변경/변경 없음/삭제 페이지 수, 추가/삭제한 청크 수, 초당 가져온 페이지 수
+    """
+    t0 = time.perf_counter()
+    stale = [p for p in pages if not ingest_manifest.is_current(str(p["id"]), p.get("version"))]
+    fetched, fetch_stats = await fetch_pages([str(p["id"]) for p in stale]) if stale else ([], {})
+    changed = []
+    stats = await asyncio.to_thread(_apply_pages, pages, dict(zip((str(p["id"]) for p in stale), fetched)), label, changed,
+                                    complete)
+    # 새로 들어간 페이지의 digest (변경 없는 페이지는 기존 digest 유지)
+    stats["digests"] = await store_digests(changed)
+    stats["fetch_failed"] = fetch_stats.get("failed", 0)
+    stats["pages_per_sec"] = fetch_stats.get("pages_per_sec", 0.0)
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    print(f"Confluence 수집: {stats}")
+    return stats
+
+
+def _apply_pages(pages, fetched, label, changed, complete=True):
+    # fetched: 가져온 페이지 id -> {"title", "url", "version", "text"} (실패하면 None)
+    # changed: 새로 넣은 페이지를 {"id", "title", "url", "text"}로 채움 (digest 생성용)
+    stats = {"pages": len(pages), "new": 0, "changed": 0, "unchanged": 0, "removed": 0,
+             "chunks_added": 0, "chunks_deleted": 0, "removal_skipped": False}
     db = get_vectorstore()
-    db.add_documents([doc])
+    with ingest_manifest._lock:
+        manifest = ingest_manifest.pages
+        for p in pages:
+            page_id = str(p["id"])
+            if page_id not in fetched:
+                stats["unchanged"] += 1
+                entry = manifest.get(page_id)
+                if entry and label and label not in entry["labels"]:
+                    entry["labels"].append(label)
+                continue
+            page = fetched[page_id]
+            if page is None:  # 가져오기 실패: 기존 청크를 그대로 두고 다음 업로드에서 다시 시도
+                continue
+            version = page.get("version") or p.get("version")
+            if ingest_manifest.is_current(page_id, version):  # 검색 결과에 버전이 없었던 경우
+                stats["unchanged"] += 1
+                continue
+            stats["changed" if page_id in manifest else "new"] += 1
+            stats["chunks_deleted"] += _delete_page_chunks(db, page_id)
+            md = page["text"]
+            splits = []
+            if md.strip():
+                splits = _split([Document(
+                    page_content=md,
+                    metadata={"title": page["title"], "url": page["url"], "id": page_id, "version": version or 0}
+                )])
+            if splits:
+                db.add_documents(splits, ids=[f"{page_id}:{version}:{i}" for i in range(len(splits))])
+                changed.append({"id": page_id, "title": page["title"], "url": page["url"], "text": md})
+            stats["chunks_added"] += len(splits)
+            labels = manifest.get(page_id, {}).get("labels", [])
+            if label and label not in labels:
+                labels.append(label)
+            manifest[page_id] = {"version": version, "title": page["title"], "labels": labels, "chunks": len(splits)}
+
+        if label and not complete:
+            # 목록에 없는 페이지가 정말 라벨에서 빠진 것인지 알 수 없으므로 지우지 않음
+            stats["removal_skipped"] = True
+        elif label:
+            current = {str(p["id"]) for p in pages}
+            for page_id, entry in list(manifest.items()):
+                if label not in entry["labels"] or page_id in current:
+                    continue
+                entry["labels"].remove(label)
+                if not entry["labels"]:
+                    # 어느 라벨에도 남지 않은 페이지
+                    stats["removed"] += 1
+                    stats["chunks_deleted"] += _delete_page_chunks(db, page_id)
+                    del manifest[page_id]
+        ingest_manifest.save()
     db.persist()
-    CACHED_VECTOR_STORE = db
+    return stats
+
+_background_tasks = set()  # 백그라운드 digest 생성 태스크 참조 유지
+
+async def update_docs(text, title, digest=None):
+    """
+    회의록/요약을 벡터 DB에 넣습니다. digest는 보통 호출한 쪽이 방금 만든 요약을 넘겨서 LLM을 다시 부르지
+    않고, 없으면 응답을 기다리게 하지 않도록 백그라운드에서 만듭니다.
+    """
+    # 같은 본문은 같은 문서 id (digest도 교체)
+    doc_id = "note:" + hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()[:16]
+    doc = Document(page_content=text, metadata={"title": title, "id": doc_id})
+    db = get_vectorstore()
+    # 임베딩(네트워크)과 DB 쓰기는 이벤트 루프 밖에서
+    await asyncio.to_thread(db.add_documents, [doc], ids=[doc_id])
+    await asyncio.to_thread(db.persist)
+    docs = [{"id": doc_id, "title": title, "url": "", "text": text}]
+    if digest is not None:
+        await store_digests(docs, [digest])
+        return
+    task = asyncio.create_task(store_digests(docs))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
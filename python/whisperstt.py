@@ -1,241 +1,223 @@
-import uuid
-from noteagent import overwrite_azure_with_whisper, overwrite_azure_with_whisper_stt, setting_name_in_meeting_log
-from shared import audio_q, stop_event
+from noteagent import overwrite_azure_with_whisper, overwrite_azure_with_whisper_stt, setting_name_in_meeting_log, new_speaker_registry, summarize_window, SUMMARY_PROMPT_VERSION
+from azurespeech import speaker_registry
+from summarycache import summary_cache
+from windowsummary import WindowSummarizer, format_offset
+import azurespeech
+import llmusage
+from shared import audio_q, AUDIO_STOP
+import asyncio
 import numpy as np
-import soundfile as sf
-import whisper
-from openai import OpenAI
+import os
 import time
-import uuid
 import noisereduce as nr
+from segmenter import VoiceSegmenter
+from audiocodec import to_mono
+from sttbackend import get_backend
+from pipeline import Pipeline, Stage
+from noisesuppress import NoiseSuppressor
+from audioqueue import drain
 
 final_meeting_log = []
 
-whisper_model = whisper.load_model("small")  # Whisper 무료 STT
-
-client = OpenAI()
 SAMPLE_RATE = 16000
-ORIG_SAMPLE_RATE = None  # 원본 오디오의 샘플 레이트 (예시)
-CHUNK_DURATION = 30  # 초 단위
+ORIG_SAMPLE_RATE = None  # 현재 입력 오디오의 샘플 레이트 (AudioFrame에서 받음)
 KEEP_DURATION = 5
-
-def detect_sample_rate(audio_chunk_length, expected_duration=1.0):
-    """첫 번째 청크의 길이로 샘플 레이트 추정"""
-    return int(audio_chunk_length / expected_duration)
-
-def process_audio():
-    global ORIG_SAMPLE_RATE
-    last_flush_time = time.time()
-    # 누적 오디오는 원본 샘플 레이트로 유지
-    accumulated_audio = np.array([], dtype=np.float32)
-    sample_rate_detected = False
-
-    while True:
-        if audio_q.empty():
-            if stop_event.is_set() and len(accumulated_audio) == 0:
-                break
-            time.sleep(0.01)
-            continue
-        if not audio_q.empty():
-            audio_chunk = audio_q.get()
-            if audio_chunk.dtype == np.int16:
-                audio_chunk = audio_chunk.astype(np.float32) / 32767.0  # 정확한 정규화
-            elif audio_chunk.dtype == np.int32:
-                audio_chunk = audio_chunk.astype(np.float32) / 2147483647.0
-            
-            # 오디오 증폭 코드 제거
-            # audio_chunk *= 1.5
-            # 첫 번째 청크에서 샘플 레이트 자동 감지
-            if not sample_rate_detected and len(audio_chunk) > 0:
-                # 일반적인 샘플 레이트들로 테스트
-                possible_rates = [44100, 48000, 22050, 16000, 8000]
-                chunk_length = len(audio_chunk)
-                
-                for rate in possible_rates:
-                    # 1초 분량의 데이터라고 가정했을 때의 추정 길이
-                    if abs(chunk_length - rate) < rate * 0.1:  # 10% 오차 허용
-                        ORIG_SAMPLE_RATE = rate
-                        break
-                
-                if ORIG_SAMPLE_RATE is None:
-                    ORIG_SAMPLE_RATE = 44100  # 기본값
-                
-                print(f"감지된 샘플 레이트: {ORIG_SAMPLE_RATE} Hz")
-                print(f"청크 크기: {chunk_length} 샘플")
-                sample_rate_detected = True
-            
-            accumulated_audio = np.append(accumulated_audio, audio_chunk)
-
-        # CHUNK_DURATION 초마다 Whisper 호출
-        if time.time() - last_flush_time >= CHUNK_DURATION and len(accumulated_audio) > 0:
-            # 30초 분량의 오디오만 추출하여 처리
-            audio_to_process = accumulated_audio[:CHUNK_DURATION * ORIG_SAMPLE_RATE]
-            print(f"처리할 오디오: {len(audio_to_process)} 샘플, {len(audio_to_process)/ORIG_SAMPLE_RATE:.2f}초")
-            # 1. 노이즈 감소 적용
-            # 노이즈가 없는 부분을 기준으로 노이즈 프로파일을 생성
-            # 간단한 예시로 전체 오디오를 노이즈 감소하지만,
-            # 실제로는 묵음 구간을 찾아 노이즈 프로파일을 생성하는 것이 더 효과적입니다.
-            try:
-                audio_reduced = nr.reduce_noise(
-                    y=audio_to_process, 
-                    sr=ORIG_SAMPLE_RATE,
-                    stationary=False,  # 정상 노이즈만 처리
-                    prop_decrease=0.8  # 50%로 감소
-                )
-                print("노이즈 감소 적용됨")
-            except Exception as e:
-                print(f"노이즈 감소 실패: {e}, 원본 사용")
-                audio_reduced = audio_to_process
-            # 2. Whisper에 최적화된 16000Hz로 리샘플링
-            # 고품질 리샘플링
-            # 리샘플링
-            # if ORIG_SAMPLE_RATE != SAMPLE_RATE:
-            #     audio_resampled = librosa.resample(
-            #         audio_reduced, 
-            #         orig_sr=ORIG_SAMPLE_RATE, 
-            #         target_sr=SAMPLE_RATE
-            #     )
-            #     print(f"리샘플링: {ORIG_SAMPLE_RATE}Hz -> {SAMPLE_RATE}Hz")
-            # else:
-            #     audio_resampled = audio_reduced
-            #     print("리샘플링 불필요")
-            audio_resampled = audio_reduced
-            
-            # 정규화 개선
-            rms = np.sqrt(np.mean(audio_resampled**2))
-            max_val = np.max(np.abs(audio_resampled))
-            
-            print(f"오디오 통계 - RMS: {rms:.4f}, Max: {max_val:.4f}")
-            
-            if max_val > 0.001:
-                # RMS 기반 정규화가 더 자연스러움
-                if rms > 0.001:
-                    target_rms = 0.15  # 적절한 음량
-                    audio_resampled = audio_resampled * (target_rms / rms)
-                else:
-                    audio_resampled = audio_resampled / max_val * 0.7
-            
-            # 클리핑 방지
-            # audio_resampled = np.clip(audio_resampled, -0.95, 0.95)
-
-            audiouuid = uuid.uuid4()
-            
-            # 리샘플링된 오디오를 16000Hz로 저장
-            sf.write(f"audiofile/temp-{audiouuid}.wav", audio_resampled, ORIG_SAMPLE_RATE, subtype='PCM_16')
-            # sf.write(f"temp-{audiouuid}.flac", audio_resampled, samplerate=SAMPLE_RATE, format="FLAC")
-            # ffmpeg로 WebM 압축
-            # ffmpeg.input(f"temp-{audiouuid}.webm").output(f"temp-{audiouuid}-converted.wav", ar=16000, ac=1, format="wav").run(overwrite_output=True)
-
-            
-            with open(f"audiofile/temp-{audiouuid}.wav", "rb") as f:
-                result = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=f,
-                    language="ko"
-                )
-
-            # print(f"[Whisper-1 STT] {result.text}")
-            log = overwrite_azure_with_whisper(result.text)
-            # log = setting_name_in_meeting_log(log)
-            final_meeting_log.extend(log)
-
-            # print(final_meeting_log)
-            for entry in final_meeting_log:
-                speaker = entry['speaker']
-                source = entry['source']
-                text = entry['text']
-                print(f"[{speaker} | {source}] {text}")
-
-            # 처리된 30초 분량 제거
-            accumulated_audio = accumulated_audio[CHUNK_DURATION * ORIG_SAMPLE_RATE:]
-            last_flush_time = time.time()
-    if len(accumulated_audio) > 0:
-        audio_to_process = accumulated_audio
-        print(f"처리할 오디오: {len(audio_to_process)} 샘플, {len(audio_to_process)/ORIG_SAMPLE_RATE:.2f}초")
-            # 1. 노이즈 감소 적용
-            # 노이즈가 없는 부분을 기준으로 노이즈 프로파일을 생성
-            # 간단한 예시로 전체 오디오를 노이즈 감소하지만,
-            # 실제로는 묵음 구간을 찾아 노이즈 프로파일을 생성하는 것이 더 효과적입니다.
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "1"))  # 한 번에 전사할 세그먼트 수 (로컬 엔진 배치 추론용)
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))  # 전사(네트워크 대기) 스테이지 worker 수
+MERGE_WORKERS = int(os.getenv("MERGE_WORKERS", "2"))  # LLM 병합 스테이지 worker 수
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))  # 스테이지 사이 큐 크기
+NOISE_SUPPRESSION = os.getenv("NOISE_SUPPRESSION", "profile")  # profile | nonstationary | off
+live_pipeline = None
+noise_suppressor = None
+meeting_start = None  # 발화 offset 기준 시각 (Azure 전사 시작, 없으면 첫 세그먼트)
+# 회의 중 5분(SUMMARY_WINDOW_SECONDS) 구간이 닫힐 때마다 미리 요약
+window_summarizer = WindowSummarizer(summarize_window, cache=summary_cache, cache_version=SUMMARY_PROMPT_VERSION)
+
+def preprocess_audio(audio_to_process, sample_rate):
+    """노이즈 감소와 음량 정규화"""
+    print(f"처리할 오디오: {len(audio_to_process)} 샘플, {len(audio_to_process)/sample_rate:.2f}초")
+    # 1. 노이즈 감소 적용
+    # 기본: VAD 묵음 구간으로 학습한 노이즈 프로파일로 stationary gating (프로파일이 준비되기 전이나
+    # NOISE_SUPPRESSION=nonstationary이면 기존 noisereduce non-stationary 방식 사용)
+    audio_reduced = None
+    suppressor = noise_suppressor
+    if NOISE_SUPPRESSION == "profile" and suppressor is not None and suppressor.ready and suppressor.sample_rate == sample_rate:
+        try:
+            audio_reduced = suppressor.reduce(audio_to_process)
+            print("노이즈 감소 적용됨 (노이즈 프로파일)")
+        except Exception as e:
+            print(f"프로파일 노이즈 감소 실패: {e}, 기존 방식 사용")
+    if audio_reduced is None and NOISE_SUPPRESSION != "off":
         try:
             audio_reduced = nr.reduce_noise(
                 y=audio_to_process, 
-                sr=ORIG_SAMPLE_RATE,
+                sr=sample_rate,
                 stationary=False,  # 정상 노이즈만 처리
                 prop_decrease=0.8  # 50%로 감소
             )
             print("노이즈 감소 적용됨")
         except Exception as e:
             print(f"노이즈 감소 실패: {e}, 원본 사용")
-            audio_reduced = audio_to_process
-        # 2. Whisper에 최적화된 16000Hz로 리샘플링
-        # 고품질 리샘플링
-        # 리샘플링
-        # if ORIG_SAMPLE_RATE != SAMPLE_RATE:
-        #     audio_resampled = librosa.resample(
-        #         audio_reduced, 
-        #         orig_sr=ORIG_SAMPLE_RATE, 
-        #         target_sr=SAMPLE_RATE
-        #     )
-        #     print(f"리샘플링: {ORIG_SAMPLE_RATE}Hz -> {SAMPLE_RATE}Hz")
-        # else:
-        #     audio_resampled = audio_reduced
-        #     print("리샘플링 불필요")
-        audio_resampled = audio_reduced
-        
-        # 정규화 개선
-        rms = np.sqrt(np.mean(audio_resampled**2))
-        max_val = np.max(np.abs(audio_resampled))
-        
-        print(f"오디오 통계 - RMS: {rms:.4f}, Max: {max_val:.4f}")
-        
-        if max_val > 0.001:
-            # RMS 기반 정규화가 더 자연스러움
-            if rms > 0.001:
-                target_rms = 0.15  # 적절한 음량
-                audio_resampled = audio_resampled * (target_rms / rms)
-            else:
-                audio_resampled = audio_resampled / max_val * 0.7
-        
-        # 클리핑 방지
-        # audio_resampled = np.clip(audio_resampled, -0.95, 0.95)
-
-        audiouuid = uuid.uuid4()
-        
-        # 리샘플링된 오디오를 16000Hz로 저장
-        sf.write(f"audiofile/temp-{audiouuid}.wav", audio_resampled, ORIG_SAMPLE_RATE, subtype='PCM_16')
-        # sf.write(f"temp-{audiouuid}.flac", audio_resampled, samplerate=SAMPLE_RATE, format="FLAC")
-        # ffmpeg로 WebM 압축
-        # ffmpeg.input(f"temp-{audiouuid}.webm").output(f"temp-{audiouuid}-converted.wav", ar=16000, ac=1, format="wav").run(overwrite_output=True)
-
-        
-        with open(f"audiofile/temp-{audiouuid}.wav", "rb") as f:
-            result = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-                language="ko"
-            )
+    if audio_reduced is None:
+        audio_reduced = audio_to_process
+    audio_resampled = audio_reduced
+    
+    # 정규화 개선
+    rms = np.sqrt(np.mean(audio_resampled**2))
+    max_val = np.max(np.abs(audio_resampled))
+    
+    print(f"오디오 통계 - RMS: {rms:.4f}, Max: {max_val:.4f}")
+    
+    if max_val > 0.001:
+        # RMS 기반 정규화가 더 자연스러움
+        if rms > 0.001:
+            target_rms = 0.15  # 적절한 음량
+            audio_resampled = audio_resampled * (target_rms / rms)
+        else:
+            audio_resampled = audio_resampled / max_val * 0.7
+    
+    # 클리핑 방지
+    # audio_resampled = np.clip(audio_resampled, -0.95, 0.95)
+    return audio_resampled
+
+# 실시간 파이프라인 스테이지: capture(process_audio 루프) -> preprocess -> transcribe -> merge -> publish
+# job = {"segments": [...]} 에 단계별 결과를 채워 다음 스테이지로 넘깁니다.
+def preprocess_stage(job):
+    for segment in job["segments"]:
+        print(f"세그먼트 {segment.start / segment.sample_rate:.2f}초~ ({time.strftime('%H:%M:%S', time.localtime(segment.timestamp))}): "
+              f"{segment.duration:.2f}초, 음성 비율 {segment.speech_ratio:.0%}")
+    job["prepared"] = [(preprocess_audio(segment.audio, segment.sample_rate), segment.sample_rate) for segment in job["segments"]]
+    return job
+
+def transcribe_stage(job):
+    # 전사 (remote: whisper-1 API, local: 로컬 Whisper 모델 배치 추론)
+    job["texts"] = get_backend().transcribe_batch(job.pop("prepared"))
+    return job
+
+def _stamper(segment):
+    """세그먼트에서 나온 발화에 회의 시작 기준 오디오 offset(start/end 초, time "MM:SS")을 붙이는 함수"""
+    global meeting_start
+    if segment.timestamp is None:
+        return live_pipeline.emit
+    if meeting_start is None:
+        meeting_start = azurespeech.session_start or segment.timestamp
+    offset = max(0.0, segment.timestamp - meeting_start)
+
+    def emit(entry):
+        entry["start"] = round(offset, 1)
+        entry["end"] = round(offset + segment.duration, 1)
+        entry["time"] = format_offset(offset)
+        live_pipeline.emit(entry)
+    return emit
+
+def merge_stage(job):
+    for segment, text in zip(job["segments"], job["texts"]):
+        # print(f"[Whisper STT] {text}")
+        # 세그먼트 캡처 구간과 겹치는 Azure 발화만 병합에 사용
+        start = segment.timestamp
+        end = start + segment.duration if start is not None else None
+        # 병합된 발화는 LLM 응답이 끝나기 전에도 순서대로 바로 회의록에 반영 (화자 이름은 레지스트리로 적용)
+        overwrite_azure_with_whisper(text, start, end, on_entry=_stamper(segment))
+    return job
+
+def publish_entry(entry):
+    """발화 하나를 final_meeting_log에 반영 (파이프라인이 세그먼트 순서를 보장)"""
+    final_meeting_log.append(entry)
+    window_summarizer.add(entry)
+    print(f"[{entry.get('time', '--:--')} {entry['speaker']} | {entry['source']}] {entry['text']}")
+
+def publish_stage(job):
+    """세그먼트 순서대로 호출됨 (발화는 merge 단계에서 publish_entry로 이미 반영)"""
+    print(f"세그먼트 {len(job['segments'])}개 반영 완료, 회의록 {len(final_meeting_log)}개 발화")
+
+def build_pipeline():
+    return Pipeline([
+        Stage("preprocess", preprocess_stage, workers=1, maxsize=PIPELINE_QUEUE_SIZE),
+        Stage("transcribe", transcribe_stage, workers=STT_WORKERS, maxsize=PIPELINE_QUEUE_SIZE),
+        Stage("merge", merge_stage, workers=MERGE_WORKERS, maxsize=PIPELINE_QUEUE_SIZE),
+    ], publish_stage, name="live-stt", publish_item=publish_entry)
+
+def pipeline_stats():
+    return live_pipeline.stats() if live_pipeline is not None else {}
+
+def _flush_segmenter(segmenter):
+    segment = segmenter.flush()
+    print(f"VAD 통계: {segmenter.stats()}")
+    return [segment] if segment is not None else []
+
+def process_audio():
+    global ORIG_SAMPLE_RATE, live_pipeline, noise_suppressor, meeting_start
+    meeting_start = azurespeech.session_start
+    window_summarizer.reset(llmusage.current_meeting)
+    live_pipeline = build_pipeline().start()
+    # VAD로 쉼 구간에서 세그먼트를 자르고, 묵음 구간은 전사하지 않음 (첫 프레임의 샘플 레이트로 생성)
+    segmenter = None
+    pending = []
+    last_seq = None
+
+    cpu_start = time.thread_time()
+    wakeups = 0
 
-        # print(f"[Whisper-1 STT] {result.text}")
-        log = overwrite_azure_with_whisper(result.text)
-        log = setting_name_in_meeting_log(log)
-        final_meeting_log.extend(log)
-
-        # print(final_meeting_log)
-        for entry in final_meeting_log:
-            speaker = entry['speaker']
-            source = entry['source']
-            text = entry['text']
-            print(f"[{speaker} | {source}] {text}")
+    while True:
+        # 청크가 들어올 때까지 블로킹 대기 후 쌓인 프레임을 한 번에 꺼냄 (종료는 AUDIO_STOP 센티널)
+        frames, stopped = drain(audio_q, AUDIO_STOP)
+        if frames:
+            wakeups += 1
+        # 같은 샘플 레이트의 연속 프레임끼리 묶어서 한 번에 세그멘터에 넣음
+        i = 0
+        while i < len(frames):
+            j = i + 1
+            while j < len(frames) and frames[j].sample_rate == frames[i].sample_rate:
+                j += 1
+            group = frames[i:j]
+            i = j
+
+            first = group[0]
+            if last_seq is not None and first.seq != last_seq + 1:
+                print(f"오디오 프레임 누락 감지: #{last_seq} 다음 #{first.seq}")
+            last_seq = group[-1].seq
+
+            if segmenter is None or segmenter.sample_rate != first.sample_rate:
+                # 첫 프레임이거나 장치 변경으로 샘플 레이트가 바뀌면 이전 세그멘터를 비우고 새로 생성
+                if segmenter is not None:
+                    print(f"샘플 레이트 변경: {segmenter.sample_rate} Hz -> {first.sample_rate} Hz")
+                    pending.extend(_flush_segmenter(segmenter))
+                ORIG_SAMPLE_RATE = first.sample_rate
+                print(f"오디오 입력: {first.sample_rate} Hz, {first.channels}채널, 프레임 {len(first)} 샘플")
+                noise_suppressor = NoiseSuppressor(first.sample_rate)
+                segmenter = VoiceSegmenter(first.sample_rate, on_silence=noise_suppressor.update_profile)
+
+            samples = np.concatenate([to_mono(frame.to_float32()) for frame in group])
+            # 쉼 구간에서 완성된 세그먼트만 모아서 STT_BATCH_SIZE개씩 전사
+            pending.extend(segmenter.push(samples, first.timestamp))
+        if len(pending) >= STT_BATCH_SIZE:
+            live_pipeline.submit({"segments": pending})
+            pending = []
+        if stopped:
+            # 남은 오디오는 루프 밖에서 마지막으로 처리
+            break
+
+    if segmenter is not None:
+        pending.extend(_flush_segmenter(segmenter))
+    if pending:
+        live_pipeline.submit({"segments": pending})
+    print(f"오디오 큐 consumer: {wakeups}회 깨어남, CPU {time.thread_time() - cpu_start:.2f}초")
+    live_pipeline.close()
+    # 마지막 구간까지 요약해 두면 회의 종료 후 요약은 구간 요약만 합침
+    window_summarizer.finish()
+    print(f"구간 요약: {window_summarizer.stats}")
+    # 이름이 나중에 확인된 화자의 앞선 발화도 이름으로 바꿈 (로컬 매핑만 적용)
+    setting_name_in_meeting_log(final_meeting_log)
+    print(f"화자 레지스트리: {speaker_registry.label_map}, {speaker_registry.stats}")
+    print(f"파이프라인 통계: {live_pipeline.stats()}")
     print("whisper stt process_audio 종료 완료")
 
-def stt_with_whisper(audiofile, azuretext):
-    result = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audiofile,
-                language="ko"
-            )
-    # print(f"[Whisper-1 STT] {result.text}")
-    log = overwrite_azure_with_whisper_stt(result.text, azuretext)
-    log = setting_name_in_meeting_log(log)
+async def stt_with_whisper(audiofile, azuretext):
+    # 전사(로컬 모델/업로드)와 병합(llm 루프 대기)은 블로킹이므로 이벤트 루프 밖에서 실행
+    text = await asyncio.to_thread(get_backend().transcribe_file, audiofile)
+    # print(f"[Whisper STT] {text}")
+    log = await asyncio.to_thread(overwrite_azure_with_whisper_stt, text, azuretext)
+    # 업로드 파일의 "화자 A"는 실시간 회의의 화자와 무관하므로 요청마다 새 레지스트리
+    log = await asyncio.to_thread(setting_name_in_meeting_log, log, new_speaker_registry())
     print(log)
     return log
\ No newline at end of file
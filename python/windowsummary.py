@@ -0,0 +1,148 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# 회의 중 구간(기본 5분)별 요약
+SUMMARY_WINDOW_SECONDS = int(os.getenv("SUMMARY_WINDOW_SECONDS", "300"))
+
+
+def format_offset(seconds):
+    """회의 시작 기준 초 -> "MM:SS" (한 시간이 넘으면 분이 60 이상)"""
+    seconds = max(0, int(seconds))
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def format_log(entries):
+    """시각이 붙은 회의록 항목을 "[MM:SS] 화자: 발화" 줄로 (요약 프롬프트용)"""
+    lines = []
+    for entry in entries:
+        prefix = f"[{entry['time']}] " if entry.get("time") else ""
+        lines.append(f"{prefix}{entry.get('speaker', '')}: {entry.get('text', '')}")
+    return "\n".join(lines)
+
+
+class WindowSummarizer:
+    """
+    실시간 회의록을 window_seconds 단위 구간으로 나눠 회의 중에 미리 요약합니다.
+
+    - add(entry)는 파이프라인이 발화를 순서대로 반영할 때 호출되며, entry["start"](회의 시작 기준 초)가
+      현재 구간을 넘으면 그 구간을 닫고 백그라운드 스레드에서 summarize(text, start, end)로 요약합니다.
+    - 구간 요약은 cache(SummaryCache)에 구간 텍스트 해시로 저장해서, 같은 구간을 다시 요약하지 않습니다.
+    - 회의가 끝나면 finish()로 마지막 구간까지 닫고, 회의 요약은 구간 요약만 합치면 됩니다.
+    """
+
+    def __init__(self, summarize, window_seconds=SUMMARY_WINDOW_SECONDS, cache=None, cache_version=""):
+        self.summarize = summarize
+        self.window_seconds = window_seconds
+        self.cache = cache
+        self.cache_version = cache_version
+        self.meeting = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="window-summary")
+        self._windows = {}  # 구간 번호 -> {"start", "end", "entries", "summary"}
+        self._futures = []
+        self._open = None  # 아직 닫히지 않은 구간 번호
+        self._open_entries = []
+        self.stats = {"windows": 0, "cached": 0, "failures": 0}
+
+    def reset(self, meeting=None):
+        """새 회의 시작 (이전 회의의 구간 요약은 버림)"""
+        with self._lock:
+            self.meeting = meeting
+            self._windows = {}
+            self._futures = []
+            self._open = None
+            self._open_entries = []
+            self.stats = {"windows": 0, "cached": 0, "failures": 0}
+
+    def add(self, entry):
+        start = entry.get("start")
+        if start is None:
+            return
+        index = int(start // self.window_seconds)
+        with self._lock:
+            if self._open is not None and index > self._open:
+                self._close()
+            if self._open is None or index > self._open:
+                self._open = index
+            self._open_entries.append(entry)
+
+    def _close(self):
+        # _lock 안에서 호출
+        if self._open is None or not self._open_entries:
+            self._open = None
+            return
+        index, entries = self._open, self._open_entries
+        self._open, self._open_entries = None, []
+        window = {
+            "start": index * self.window_seconds,
+            "end": (index + 1) * self.window_seconds,
+            "entries": len(entries),
+            "summary": None,
+        }
+        self._windows[index] = window
+        self._futures.append(self._executor.submit(self._run, window, format_log(entries)))
+
+    def _summary_of(self, text, start, end):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key("window", text, version=self.cache_version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cached"] += 1
+                return cached
+        summary = self.summarize(text, start, end)
+        if key is not None:
+            self.cache.put(key, summary)
+        return summary
+
+    def _run(self, window, text):
+        try:
+            window["summary"] = self._summary_of(text, window["start"], window["end"])
+            self.stats["windows"] += 1
+            print(f"구간 요약 완료: {format_offset(window['start'])}~{format_offset(window['end'])} ({window['entries']}개 발화)")
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"구간 요약 실패 ({format_offset(window['start'])}~): {e}")
+
+    def _labeled(self, window):
+        return dict(window, label=f"{format_offset(window['start'])}~{format_offset(window['end'])}")
+
+    def finish(self):
+        """마지막 구간까지 닫고 진행 중인 구간 요약을 기다린 뒤 구간 요약 목록 반환"""
+        with self._lock:
+            self._close()
+        return self.collect(include_open=False)
+
+    def collect(self, include_open=True):
+        """
+        닫힌 구간의 요약이 끝나기를 기다려 시간순으로 반환합니다.
+        include_open이면 아직 진행 중인 구간도 지금까지의 발화로 요약해서 포함합니다 (회의 중 요약 요청용).
+        """
+        with self._lock:
+            futures = list(self._futures)
+            open_index, open_entries = self._open, list(self._open_entries)
+        wait(futures)
+        with self._lock:
+            windows = [self._labeled(self._windows[i]) for i in sorted(self._windows)]
+        if include_open and open_index is not None and open_entries:
+            start, end = open_index * self.window_seconds, (open_index + 1) * self.window_seconds
+            try:
+                summary = self._summary_of(format_log(open_entries), start, end)
+            except Exception as e:
+                print(f"진행 중 구간 요약 실패: {e}")
+                summary = None
+            windows.append(self._labeled({"start": start, "end": end, "entries": len(open_entries), "summary": summary}))
+        return [w for w in windows if w["summary"]]
+
+    def report(self):
+        with self._lock:
+            return {
+                "meeting": self.meeting,
+                "window_seconds": self.window_seconds,
+                "closed": len(self._windows),
+                "pending": sum(1 for f in self._futures if not f.done()),
+                "open_entries": len(self._open_entries),
+                "stats": dict(self.stats),
+                "windows": [self._labeled(self._windows[i]) for i in sorted(self._windows)],
+            }